@@ -0,0 +1,53 @@
+from classes.Providers.Indeed import Indeed
+from termcolor import colored
+
+import argparse
+import time
+
+
+def _time_detail_pass(indeed: Indeed, jobs: list, parallelism: int, fast_parse: bool) -> float:
+    """
+    Parses every job detail page and returns the wall-clock time it took.
+
+    :param indeed: Indeed instance to parse with.
+    :param jobs: Jobs found by the search.
+    :param parallelism: Number of Chrome workers.
+    :param fast_parse: Whether to try the HTTP parser first, see `indeed.fastParse`.
+        Off, every page is opened in Chrome.
+
+    :return: Elapsed seconds.
+    """
+    indeed.indeed_conf = {**indeed.indeed_conf, "fastParse": fast_parse}
+    start = time.perf_counter()
+
+    for _ in indeed._parse_jobs(jobs, parallelism):
+        pass
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare serial and pooled job detail parsing in Chrome, "
+                                                 "and the HTTP fast path.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--job-query", default="")
+    parser.add_argument("--place-query", default="")
+    args = parser.parse_args()
+
+    indeed = Indeed(job_query=args.job_query, place_query=args.place_query)
+    jobs = indeed.search(advanced=False)
+
+    # Chrome only, or the HTTP fast path would hide what the pool changes
+    serial = _time_detail_pass(indeed, jobs, 1, fast_parse=False)
+    pooled = _time_detail_pass(indeed, jobs, args.workers, fast_parse=False)
+    fast = _time_detail_pass(indeed, jobs, args.workers, fast_parse=True)
+
+    print(colored(f"=> Serial Chrome: {serial:.2f}s for {len(jobs)} Jobs", "blue"))
+    print(colored(f"=> Pooled Chrome ({args.workers} workers): {pooled:.2f}s for {len(jobs)} Jobs", "blue"))
+    print(colored(f"=> Speedup: {serial / pooled:.2f}x", "green"))
+    print(colored(f"=> HTTP fast path (Chrome fallback on {args.workers} workers): {fast:.2f}s " \
+                  f"for {len(jobs)} Jobs, {serial / fast:.2f}x serial Chrome", "green"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+from classes.Providers.Indeed import Indeed
+from urllib.parse import urlparse, parse_qs, quote
+from classes.Profile import compile_prompt_context
+from urllib.request import urlopen
+from classes.Database import Database
+from classes.Metrics import metrics
+from classes.Mailer import get_mailer
+from benchmarks import smtp_sink, stub_llm
+from helpers import _run_pipeline
+from lxml import html as lxml_html
+from config import load_config
+from termcolor import colored
+from typing import Dict, List
+
+import contextlib
+import subprocess
+import statistics
+import threading
+import argparse
+import resource
+import tempfile
+import platform
+import json
+import yaml
+import io
+import time
+import sys
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Job keys in indeed_search.html, replaced with generated ones on every page
+FIXTURE_JOB_KEYS = [f"fixturejob{index:06d}" for index in range(10)]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serves the recorded Indeed pages: /jobs?start=N renders the search
+    fixture with ten new job keys, /rc/clk?jk=KEY the job fixture for KEY.
+    """
+    total_jobs = 10
+    search_page = ""
+    job_page = ""
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        if url.path == "/jobs":
+            start = int(query.get("start", ["0"])[0])
+            body = self.search_page
+
+            for index, job_key in enumerate(FIXTURE_JOB_KEYS):
+                body = body.replace(job_key, f"job{start + index:013d}")
+
+            if start + 10 >= self.total_jobs:
+                body = body.replace('data-testid="pagination-page-next"', "")
+        elif url.path == "/rc/clk":
+            job_key = query.get("jk", [""])[0]
+            body = self.job_page.replace(
+                'class="jobsearch-jobDescriptionText">',
+                f'class="jobsearch-jobDescriptionText">\n<p>Reference {job_key}</p>',
+                1
+            )
+        else:
+            self.send_error(404)
+            return
+
+        reply = body.encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def serve_fixtures(total_jobs: int) -> ThreadingHTTPServer:
+    """
+    Serves the recorded search and job pages on a random local port.
+
+    :param total_jobs: Number of jobs the search returns, over pages of ten.
+    :return: The running server.
+    """
+    with open(os.path.join(FIXTURES_DIR, "indeed_search.html")) as file:
+        search_page = file.read()
+
+    with open(os.path.join(FIXTURES_DIR, "indeed_job.html")) as file:
+        job_page = file.read()
+
+    handler = type("Handler", (FixtureHandler,), {
+        "total_jobs": total_jobs,
+        "search_page": search_page,
+        "job_page": job_page
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def _peak_rss_mb() -> float:
+    # Helper function to get the peak resident set size of this process so far
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    # Helper function to get a percentile by linear interpolation
+    if len(values) == 1:
+        return values[0]
+
+    return statistics.quantiles(values, n=100, method="inclusive")[int(percent) - 1]
+
+
+class FixtureElement:
+    def __init__(self, element) -> None:
+        """
+        An element of a recorded page, as returned by FixtureDriver.
+
+        :param element: The lxml element.
+        """
+        self.element = element
+
+    @property
+    def text(self) -> str:
+        return self.element.text_content().strip()
+
+    def get_attribute(self, name: str) -> str:
+        if name == "innerHTML":
+            return (self.element.text or "") + "".join(
+                lxml_html.tostring(child, encoding="unicode") for child in self.element
+            )
+
+        return self.element.get(name)
+
+
+class FixtureDriver:
+    """
+    Stands in for Chrome on the recorded pages, so the search goes through
+    Indeed's own code: pages are loaded over HTTP and elements are looked
+    up by ID in their HTML.
+    """
+    session_id = "fixtures"
+
+    def __init__(self) -> None:
+        self.current_url = None
+        self.page_source = ""
+        self._tree = None
+
+    def get(self, url: str) -> None:
+        with urlopen(quote(url, safe=":/?&=%"), timeout=10) as response:
+            self.page_source = response.read().decode()
+
+        self.current_url = url
+        self._tree = lxml_html.fromstring(self.page_source)
+
+    def find_elements(self, by: str, value: str) -> List[FixtureElement]:
+        if by != By.ID or self._tree is None:
+            return []
+
+        return [FixtureElement(element) for element in self._tree.xpath(f'//*[@id="{value}"]')]
+
+    def find_element(self, by: str, value: str) -> FixtureElement:
+        elements = self.find_elements(by, value)
+
+        if not elements:
+            raise NoSuchElementException(f"No element with {by} {value}")
+
+        return elements[0]
+
+    def execute_script(self, script: str, *args) -> list:
+        # Recorded pages load nothing else, the network is always idle
+        return ["complete", 0]
+
+    def execute_cdp_cmd(self, command: str, params: dict) -> dict:
+        return {}
+
+    def get_log(self, log_type: str) -> list:
+        return []
+
+    def quit(self) -> None:
+        pass
+
+
+def _write_config(directory: str, size: int, workers: int, fixtures_url: str, llm_url: str, smtp_port: int) -> str:
+    """
+    Writes a config.json running every stage against the local servers.
+
+    Near-duplicate detection is off: the recorded job pages only differ in
+    their job key, so every job would be a duplicate of the first one.
+
+    :param directory: Directory of the run.
+    :param size: Number of jobs.
+    :param workers: Workers of the parse, letter and send stages.
+    :param fixtures_url: URL of the recorded pages.
+    :param llm_url: URL of the stub LLM.
+    :param smtp_port: Port of the SMTP sink.
+
+    :return: Path of the config
+    """
+    config = {
+        "chrome": {"userDataDir": directory, "profileName": "Default", "headless": True},
+        "indeed": {
+            "jobQuery": "Software Engineer",
+            "placeQuery": "New York, USA",
+            "baseUrl": fixtures_url,
+            "parallelism": 1,
+            "maxPages": (size + 9) // 10,
+            "maxJobs": size
+        },
+        "smtp": {
+            "sender_name": "Jobber",
+            "host": "127.0.0.1",
+            "port": smtp_port,
+            "secure": False,
+            "insecure": True,
+            "auth": {"user": "", "pass": ""},
+            "from": "jobber@localhost"
+        },
+        "llm": {
+            "baseUrl": llm_url,
+            "concurrency": workers,
+            "interactive": True,
+            "requestsPerMinute": 0,
+            "cache": {"enabled": False}
+        },
+        "pdf": {"workers": os.cpu_count()},
+        "dedup": {"enabled": False},
+        "pipeline": {"parseWorkers": workers, "sendWorkers": workers},
+        "metrics": {"enabled": True, "path": os.path.join(directory, "metrics.jsonl")}
+    }
+
+    path = os.path.join(directory, "config.json")
+
+    with open(path, "w") as file:
+        json.dump(config, file, indent=4)
+
+    # Scored against by the pipeline
+    with open(os.path.join(directory, "resume_config.yaml"), "w") as file:
+        yaml.safe_dump({"skills": stub_llm.SAMPLE_INFO["skills"], "projects": stub_llm.SAMPLE_INFO["projects"]}, file)
+
+    return path
+
+
+def _stage(name: str, latencies: List[float]) -> Dict:
+    """
+    Summarizes one stage and prints it.
+
+    :param name: Stage name.
+    :param latencies: Duration of every call of the stage, in seconds. A
+        call handles one job, or one batch in the write, score and render stages.
+
+    :return: The summary
+    """
+    summary = {
+        "calls": len(latencies),
+        "busy_seconds": round(sum(latencies), 4),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2) if latencies else None
+    }
+
+    print(colored(f"\t=> {name}: {summary['calls']} calls, {summary['busy_seconds']}s busy, " \
+                  f"p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms", "blue"))
+
+    return summary
+
+
+def run(size: int, workers: int, llm_latency: float) -> Dict:
+    """
+    Runs the application pipeline of main.py over `size` jobs, offline:
+    Indeed.iter_listings on the recorded search pages through FixtureDriver,
+    then every pipeline stage, against a stub LLM and an SMTP sink.
+
+    :param size: Number of jobs.
+    :param workers: Workers of the parse, letter and send stages.
+    :param llm_latency: Seconds the stub LLM waits before every reply.
+
+    :return: Summary of every stage, with the peak RSS of the run
+    """
+    fixtures = serve_fixtures(size)
+    llm = stub_llm.serve(llm_latency)
+    sink = smtp_sink.serve()
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = _write_config(directory, size, workers, \
+                                    f"http://127.0.0.1:{fixtures.server_address[1]}", \
+                                    f"http://127.0.0.1:{llm.server_address[1]}", sink.port)
+
+        # Drafts, cover letters and caches are written to the working directory
+        os.chdir(directory)
+
+        try:
+            load_config(config_path)
+            # Every span is read back for the stage latencies
+            metrics.configure({"enabled": True, "maxSpans": size * 100})
+
+            resume_path = os.path.join(directory, "resume.pdf")
+
+            with open(resume_path, "wb") as file:
+                file.write(b"%PDF-1.4\n" + os.urandom(32 * 1024))
+
+            db = Database(os.path.join(directory, "jobber.db"))
+            db.create_table()
+
+            # The interactive review approves every letter
+            sys.stdin = io.StringIO("y\n" * size)
+            start = time.perf_counter()
+
+            # The pipeline prints every job, keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                indeed = Indeed(db=db, driver=FixtureDriver())
+                applied = _run_pipeline(indeed, compile_prompt_context(stub_llm.SAMPLE_INFO), resume_path)
+
+                # Until every queued email was delivered
+                get_mailer().close()
+
+            elapsed = time.perf_counter() - start
+            applications = db.count_applications()
+            db.close()
+        finally:
+            sys.stdin = sys.__stdin__
+            os.chdir(cwd)
+
+    fixtures.shutdown()
+    llm.shutdown()
+    sink.stop()
+
+    latencies = {}
+
+    for span in metrics.snapshot()["spans"]:
+        if span["name"] == "pipeline.stage":
+            latencies.setdefault(span["labels"]["stage"], []).append(span["duration"])
+        elif span["name"] == "indeed.page_load" and span["labels"]["page"] == "results":
+            latencies.setdefault("search", []).append(span["duration"])
+
+    stages = {name: _stage(name, durations) for name, durations in latencies.items()}
+
+    print(colored(f"\t=> {applied} of {size} jobs applied to in {elapsed:.2f}s " \
+                  f"({applied / elapsed:.2f} jobs/s), applications: " + \
+                  ", ".join(f"{count} {state}" for state, count in sorted(applications.items())), \
+                  "green" if applied == size else "yellow"))
+
+    return {
+        "jobs": size,
+        "applied": applied,
+        "applications": applications,
+        "seconds": round(elapsed, 4),
+        "throughput": round(applied / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "stages": stages
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the application pipeline offline against recorded pages, a stub LLM and an SMTP sink.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--output", help="JSON file for the results. Defaults to benchmarks/results/end_to_end-<time>.json.")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # One size per process, so peak RSS isn't carried over from a bigger run
+        print(json.dumps(run(args.child, args.workers, args.llm_latency)))
+        return
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workers": args.workers,
+        "llm_latency": args.llm_latency,
+        "runs": []
+    }
+
+    for size in args.sizes:
+        print(colored(f"=> {size} Jobs", "green"))
+
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.end_to_end", "--child", str(size), \
+             "--workers", str(args.workers), "--llm-latency", str(args.llm_latency)],
+            stdout=subprocess.PIPE,
+            text=True
+        )
+        lines = child.stdout.rstrip().splitlines()
+
+        if child.returncode != 0 or not lines:
+            print(colored(f"=> Run with {size} Jobs failed!", "red"))
+            continue
+
+        print("\n".join(lines[:-1]))
+        results["runs"].append(json.loads(lines[-1]))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"end_to_end-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    print(colored(f"=> Results saved to {output}", "green"))
+
+
+if __name__ == "__main__":
+    main()
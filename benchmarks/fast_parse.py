@@ -0,0 +1,60 @@
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from classes.Providers.Indeed import _parse_job_fast
+from termcolor import colored
+from functools import partial
+
+import argparse
+import threading
+import time
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+
+def _serve_fixtures() -> ThreadingHTTPServer:
+    """
+    Serves the fixtures directory on a random local port.
+
+    :return: The running server.
+    """
+    handler = partial(_QuietHandler, directory=FIXTURES_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the HTTP + lxml job page parser against saved fixtures.")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    server = _serve_fixtures()
+    url = f"http://127.0.0.1:{server.server_address[1]}/indeed_job.html"
+
+    job = _parse_job_fast(url)
+    if job is None:
+        print(colored("=> Fast path could not parse the fixture!", "red"))
+        return
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        _parse_job_fast(url)
+    elapsed = time.perf_counter() - start
+
+    print(colored(f"=> Salary: {job['salary']}", "blue"))
+    print(colored(f"=> Benefits: {', '.join(job['benefits'])}", "blue"))
+    print(colored(f"=> Apply Button: {job.get('apply_button')}", "blue"))
+    print(colored(f"=> {elapsed / args.iterations * 1000:.2f} ms per Job ({args.iterations} iterations)", "green"))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from classes.LeanBrowsing import enable_lean_mode, enable_network_log, lean_options, network_stats
+from selenium.webdriver.chrome.webdriver import WebDriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from classes.DriverPool import get_chromedriver_path
+from classes.Providers.Indeed import _parse_job
+from termcolor import colored
+
+import threading
+import argparse
+import tempfile
+import shutil
+import time
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Stand-ins for what a real job page pulls in next to its DOM
+ASSETS = {
+    "/assets/logo-{index}.png": ("image/png", 150 * 1024),
+    "/assets/brand.woff2": ("font/woff2", 80 * 1024),
+    "/assets/intro.mp4": ("video/mp4", 1024 * 1024),
+    "/www.google-analytics.com/analytics.js": ("application/javascript", 60 * 1024)
+}
+
+
+def _job_page(images: int) -> bytes:
+    """
+    Returns the job fixture with images, a web font, a video and an
+    analytics script added to it.
+
+    :param images: Number of images on the page.
+    :return: The HTML
+    """
+    with open(os.path.join(FIXTURES_DIR, "indeed_job.html")) as file:
+        page_html = file.read()
+
+    assets = "".join(f'<img src="/assets/logo-{index}.png">' for index in range(images))
+    assets += '<style>@font-face { font-family: Brand; src: url("/assets/brand.woff2"); } ' \
+              'body { font-family: Brand; }</style>'
+    assets += '<video src="/assets/intro.mp4" autoplay muted></video>'
+    assets += '<script src="/www.google-analytics.com/analytics.js"></script>'
+
+    return page_html.replace("</body>", assets + "</body>").encode()
+
+
+def _serve(images: int) -> ThreadingHTTPServer:
+    """
+    Serves the job page and its assets on a random local port.
+
+    :param images: Number of images on the page.
+    :return: The running server.
+    """
+    page = _job_page(images)
+    sizes = {path.replace("{index}", ""): asset for path, asset in ASSETS.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.startswith("/job"):
+                content_type, body = "text/html", page
+            else:
+                # Image paths differ only in their number
+                key = "".join(char for char in self.path if not char.isdigit()) \
+                    if self.path.startswith("/assets/logo-") else self.path
+
+                if key not in sizes:
+                    self.send_error(404)
+                    return
+
+                content_type, size = sizes[key]
+                body = b"\0" * size
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def _run(url: str, pages: int, lean: bool) -> dict:
+    """
+    Loads the job page in a fresh headless Chrome and parses it.
+
+    :param url: URL of the job page.
+    :param pages: Number of loads.
+    :param lean: Whether to block images, fonts, media and trackers.
+    :return: Seconds per page, requests, bytes and whether parsing worked
+    """
+    profile_dir = tempfile.mkdtemp(prefix="jobber-lean-")
+
+    lean_settings = {"enabled": True}
+    options = lean_options(Options(), lean_settings) if lean else enable_network_log(Options())
+    options.add_argument("--headless")
+    options.add_argument(f"--user-data-dir={profile_dir}")
+
+    driver = WebDriver(options=options, service=Service(get_chromedriver_path()))
+
+    try:
+        if lean:
+            enable_lean_mode(driver, lean_settings)
+        else:
+            driver.execute_cdp_cmd("Network.enable", {})
+
+        driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
+
+        network_stats.reset()
+        parsed = True
+        start = time.perf_counter()
+
+        for page in range(pages):
+            job = _parse_job(f"{url}?page={page}", driver, wait_timeout=10)
+            parsed = parsed and job.get("job_description_markdown", "N/A") != "N/A"
+
+        elapsed = time.perf_counter() - start
+    finally:
+        driver.quit()
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+    return {
+        "seconds_per_page": elapsed / pages,
+        "loaded": sum(network_stats.loaded.values()),
+        "bytes": sum(network_stats.loaded_bytes.values()),
+        "blocked": sum(network_stats.blocked.values()),
+        "parsed": parsed
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare requests and bytes of job pages with and without lean Chrome.")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--images", type=int, default=12)
+    args = parser.parse_args()
+
+    server = _serve(args.images)
+    url = f"http://127.0.0.1:{server.server_address[1]}/job"
+    network_stats.enabled = True
+
+    results = {mode: _run(url, args.pages, mode == "lean") for mode in ("full", "lean")}
+
+    server.shutdown()
+
+    for mode, result in results.items():
+        print(colored(f"=> {mode.title()}: {result['loaded'] / args.pages:.1f} requests and " \
+                      f"{result['bytes'] / args.pages / 1024:.0f} KB per page, {result['blocked'] / args.pages:.1f} blocked, " \
+                      f"{result['seconds_per_page'] * 1000:.0f} ms per page, " \
+                      f"description {'parsed' if result['parsed'] else 'MISSING'}", "blue"))
+
+    saved = results["full"]["bytes"] - results["lean"]["bytes"]
+    print(colored(f"=> Lean Chrome saved {saved / args.pages / 1024:.0f} KB " \
+                  f"({saved / max(1, results['full']['bytes']):.0%}) per page", "green"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from classes.PDFRenderer import PDFRenderer
+from termcolor import colored
+
+import subprocess
+import argparse
+import tempfile
+import time
+import os
+
+SAMPLE_LETTER = """# Anakin Skywalker
+
+Mos Eisley, Tatooine | anakin@skywalker.com | 123-456-7890
+
+Dear Hiring Manager,
+
+I am excited to apply for the **Software Engineer** position at Example Corp.
+Over the past years I have built Python and Rust services, including
+[padme](https://padme.cc), a multiplatform gameboy engine.
+
+- Designed and operated services on AWS with Docker and Kubernetes
+- Led the migration of a monolith to event-driven services
+- Mentored junior engineers
+
+| Skill | Years |
+|-------|-------|
+| Python | 6 |
+| Rust | 3 |
+
+Thank you for considering my application.
+
+Best Regards,
+Anakin Skywalker
+"""
+
+
+def _render_subprocess(directory: str, count: int) -> float:
+    """
+    Renders letters with one md2pdf CLI process per letter, like before.
+
+    :param directory: Output directory.
+    :param count: Number of letters.
+
+    :return: Elapsed seconds.
+    """
+    start = time.perf_counter()
+
+    for i in range(count):
+        markdown_path = os.path.join(directory, f"subprocess-{i}.md")
+        with open(markdown_path, "w") as file:
+            file.write(SAMPLE_LETTER)
+
+        subprocess.run(["md2pdf", markdown_path, os.path.join(directory, f"subprocess-{i}.pdf"), \
+                        "--css", "css/md2pdf.css"], check=True, capture_output=True)
+
+    return time.perf_counter() - start
+
+
+def _render_pool(directory: str, count: int, workers: int) -> float:
+    """
+    Renders letters in one batch with the in-process renderer.
+
+    :param directory: Output directory.
+    :param count: Number of letters.
+    :param workers: Number of render processes.
+
+    :return: Elapsed seconds.
+    """
+    renderer = PDFRenderer(workers=workers)
+    letters = [(SAMPLE_LETTER, os.path.join(directory, f"pool-{i}.pdf")) for i in range(count)]
+
+    start = time.perf_counter()
+    renderer.render_batch(letters)
+    elapsed = time.perf_counter() - start
+
+    renderer.close()
+
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare md2pdf subprocesses with the in-process PDF renderer.")
+    parser.add_argument("--letters", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess_elapsed = _render_subprocess(directory, args.letters)
+        pool_elapsed = _render_pool(directory, args.letters, args.workers)
+
+    print(colored(f"=> md2pdf subprocess: {args.letters / subprocess_elapsed:.1f} letters/s " \
+                  f"({subprocess_elapsed:.2f}s for {args.letters})", "blue"))
+    print(colored(f"=> In-process pool ({args.workers} workers): {args.letters / pool_elapsed:.1f} letters/s " \
+                  f"({pool_elapsed:.2f}s for {args.letters})", "blue"))
+    print(colored(f"=> Speedup: {subprocess_elapsed / pool_elapsed:.2f}x", "green"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from aiosmtpd.controller import Controller
+from classes.Mailer import Mailer
+from termcolor import colored
+
+import argparse
+import tempfile
+import socket
+import time
+import os
+
+
+class SinkHandler:
+    def __init__(self) -> None:
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        self.messages.append(envelope)
+
+        return "250 Message accepted for delivery"
+
+
+def serve() -> Controller:
+    """
+    Starts an SMTP server on a random local port that accepts and keeps
+    every message, without TLS or authentication.
+
+    :return: The running controller, its handler holds the messages.
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    controller = Controller(SinkHandler(), hostname="127.0.0.1", port=port)
+    controller.start()
+
+    return controller
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Send applications through the queued mailer to a local SMTP sink.")
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+
+    controller = serve()
+
+    mailer = Mailer({
+        "sender_name": "Jobber",
+        "host": "127.0.0.1",
+        "port": controller.port,
+        "secure": False,
+        "insecure": True,
+        "auth": {"user": "", "pass": ""},
+        "from": "jobber@localhost"
+    })
+
+    with tempfile.TemporaryDirectory() as directory:
+        attachment = os.path.join(directory, "cover_letter.pdf")
+        with open(attachment, "wb") as file:
+            file.write(b"%PDF-1.4\n" + os.urandom(32 * 1024))
+
+        start = time.perf_counter()
+        for i in range(args.messages):
+            mailer.send(f"hr{i}@example.com", "Application", "Dear Hiring Manager,", [attachment])
+        queued = time.perf_counter() - start
+
+        mailer.close()
+        elapsed = time.perf_counter() - start
+
+    received = len(controller.handler.messages)
+    controller.stop()
+
+    print(colored(f"=> Queued {args.messages} Emails in {queued * 1000:.1f} ms", "blue"))
+    print(colored(f"=> Delivered {received}/{args.messages} Emails in {elapsed:.2f}s " \
+                  f"({mailer.failed} failed)", "green" if received == args.messages else "red"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+from termcolor import colored
+
+import statistics
+import subprocess
+import argparse
+import tempfile
+import shutil
+import json
+import time
+import sys
+import os
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Everything main() does before it needs the browser: imports, config, database and profile
+FIRST_WORK_SCRIPT = """
+import time
+start = time.perf_counter()
+
+import main
+from classes.Metrics import metrics
+from classes.Database import Database
+from classes.Profile import Profile
+from config import load_config, get_metrics_settings
+
+load_config()
+metrics.configure(get_metrics_settings())
+db = Database()
+db.create_table()
+Profile.load()
+
+print(time.perf_counter() - start)
+"""
+
+CONFIG_SCRIPT = """
+import time, json
+from config import get_indeed_settings, get_llm_settings, get_smtp_settings
+
+start = time.perf_counter()
+for _ in range({calls}):
+    json.load(open("config.json"))["indeed"]
+reparsed = time.perf_counter() - start
+
+start = time.perf_counter()
+for _ in range({calls}):
+    get_indeed_settings(), get_llm_settings(), get_smtp_settings()
+loaded_once = (time.perf_counter() - start) / 3
+
+print(reparsed, loaded_once)
+"""
+
+DRIVER_SCRIPT = """
+import time
+from classes.DriverPool import get_chromedriver_path
+start = time.perf_counter()
+path = get_chromedriver_path()
+print(time.perf_counter() - start)
+"""
+
+
+def _run(args: list, cwd: str) -> tuple:
+    """
+    Runs a Python process from the repository.
+
+    :param args: Arguments for the interpreter.
+    :param cwd: Working directory, with a config.json.
+    :return: (wall clock seconds, last line of stdout)
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + args, cwd=cwd, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    lines = result.stdout.strip().splitlines()
+
+    return elapsed, lines[-1] if lines else ""
+
+
+def _median_ms(values: list) -> float:
+    # Helper function to summarize repeated timings
+    return statistics.median(values) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time interpreter startup, imports and the work before the browser starts.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="jobber-startup-")
+    shutil.copy(os.path.join(REPO_DIR, "example.config.json"), os.path.join(work_dir, "config.json"))
+
+    # A resolved driver, as a previous run leaves it; Chrome itself isn't needed
+    with open(os.path.join(work_dir, "driver_manifest.json"), "w") as file:
+        json.dump({"path": sys.executable, "browser_version": None}, file)
+
+    try:
+        timings = {"interpreter": [], "help": [], "first_work": [], "first_work_inside": [], \
+                   "import_main": [], "driver_cached": []}
+
+        for _ in range(args.runs):
+            timings["interpreter"].append(_run(["-c", "pass"], work_dir)[0])
+            timings["help"].append(_run([os.path.join(REPO_DIR, "main.py"), "--help"], work_dir)[0])
+            timings["import_main"].append(_run(["-c", "import main"], work_dir)[0])
+
+            wall, inside = _run(["-c", FIRST_WORK_SCRIPT], work_dir)
+            timings["first_work"].append(wall)
+            timings["first_work_inside"].append(float(inside))
+
+            timings["driver_cached"].append(float(_run(["-c", DRIVER_SCRIPT], work_dir)[1]))
+
+        _, config_line = _run(["-c", CONFIG_SCRIPT.format(calls=1000)], work_dir)
+        reparsed, loaded_once = map(float, config_line.split())
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    first_work = _median_ms(timings["first_work"])
+
+    print(colored(f"=> Interpreter alone: {_median_ms(timings['interpreter']):.0f} ms", "blue"))
+    print(colored(f"=> import main: {_median_ms(timings['import_main']):.0f} ms", "blue"))
+    print(colored(f"=> main.py --help: {_median_ms(timings['help']):.0f} ms", "blue"))
+    print(colored(f"=> Cached chromedriver lookup: {_median_ms(timings['driver_cached']):.1f} ms", "blue"))
+    print(colored(f"=> Settings lookup: {reparsed * 1000:.1f} µs re-parsing config.json, " \
+                  f"{loaded_once * 1000:.2f} µs loaded once", "blue"))
+    print(colored(f"=> Start to first useful work: {first_work:.0f} ms " \
+                  f"({_median_ms(timings['first_work_inside']):.0f} ms after the interpreter started), " \
+                  f"median of {args.runs} runs", "green" if first_work <= args.target_ms else "red"))
+    print(colored(f"=> Target: {args.target_ms:.0f} ms, " \
+                  f"{'met' if first_work <= args.target_ms else 'missed'}", \
+                  "green" if first_work <= args.target_ms else "red"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from helpers import _generate_cover_letters_async
+from classes.Profile import compile_prompt_context
+from classes.GPT import GPT
+from termcolor import colored
+
+import argparse
+import hashlib
+import threading
+import asyncio
+import json
+import time
+
+SAMPLE_INFO = {
+    "full_name": "Anakin Skywalker",
+    "email": "anakin@skywalker.com",
+    "city": "Mos Eisley",
+    "country": "Tatooine",
+    "phone_number": "123-456-7890",
+    "profiles": [{"network": "GitHub", "username": "alexlren", "url": "https://github.com/alexlren"}],
+    "skills": [{"name": "Languages", "keywords": ["Rust", "Python"]}],
+    "educations": [{"area": "Jedi / General", "institution": "Jedi Academy", "start_date": "2011-01-01"}],
+    "projects": [{"name": "padme", "description": "a multiplatform gameboy engine", "keywords": ["Rust"], "project_url": "https://padme.cc"}],
+}
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    # Seconds to wait before answering, to mimic model latency
+    latency = 0.0
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        prompt = body["messages"][-1]["content"]
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+
+        time.sleep(self.latency)
+
+        reply = json.dumps({
+            "id": f"chatcmpl-{digest}",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": f"Dear Hiring Manager,\n\nCover letter {digest}.\n\nBest Regards,\nJobber"
+                }
+            }]
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def serve(latency: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Starts a deterministic OpenAI-compatible chat completions server on a
+    random local port. Replies only depend on the prompt.
+
+    :param latency: Seconds to wait before every reply.
+
+    :return: The running server.
+    """
+    handler = type("Handler", (StubLLMHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate cover letters in batch against a local stub LLM.")
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--cache", action="store_true", help="Go through the LLM cache, later runs then hit it.")
+    args = parser.parse_args()
+
+    server = serve(args.latency)
+    gpt = GPT({
+        "baseUrl": f"http://127.0.0.1:{server.server_address[1]}",
+        "requestsPerMinute": 0,
+        "cache": {"enabled": args.cache, "path": "bench_llm_cache.db"}
+    })
+
+    profile_context = compile_prompt_context(SAMPLE_INFO)
+    jobs = [{"id": i, "job_description_markdown": f"Job description {i}"} for i in range(args.jobs)]
+
+    for concurrency in (1, args.concurrency):
+        start = time.perf_counter()
+        cover_letters = asyncio.run(_generate_cover_letters_async(jobs, profile_context, concurrency, gpt))
+        elapsed = time.perf_counter() - start
+
+        generated = sum(1 for cover_letter in cover_letters.values() if cover_letter)
+        print(colored(f"=> Concurrency {concurrency}: {generated} Cover Letters in {elapsed:.2f}s", "blue"))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
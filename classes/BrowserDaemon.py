@@ -0,0 +1,263 @@
+from selenium.webdriver.chrome.webdriver import WebDriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from classes.DriverPool import get_chromedriver_path
+from classes.LeanBrowsing import browser_arguments
+from classes.Metrics import metrics
+from termcolor import colored
+from urllib.request import urlopen
+
+import subprocess
+import signal
+import shutil
+import json
+import time
+import sys
+import os
+
+# Remembers the Chrome started by the daemon between runs
+DAEMON_STATE_PATH = "browser_daemon.json"
+
+# Profile owned by the daemon, never the everyday Chrome profile: its debugging
+# port is unauthenticated, and Chrome 136+ refuses remote debugging on the default one
+DAEMON_PROFILE_DIR = "browser_profile"
+
+# Where Chrome is installed when it isn't on the PATH
+CHROME_PATHS = {
+    "darwin": ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"],
+    "win32": [
+        os.path.expandvars(r"%ProgramFiles%\Google\Chrome\Application\chrome.exe"),
+        os.path.expandvars(r"%ProgramFiles(x86)%\Google\Chrome\Application\chrome.exe"),
+        os.path.expandvars(r"%LocalAppData%\Google\Chrome\Application\chrome.exe")
+    ]
+}
+
+CHROME_NAMES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+
+def _find_chrome() -> str:
+    """
+    Returns the path of the Chrome binary.
+
+    :return: Path to Chrome, or None if it can't be found
+    """
+    for name in CHROME_NAMES:
+        path = shutil.which(name)
+
+        if path:
+            return path
+
+    for path in CHROME_PATHS.get(sys.platform, []):
+        if os.path.exists(path):
+            return path
+
+    return None
+
+
+def _is_running(pid: int) -> bool:
+    """
+    Returns whether a process is still alive.
+
+    :param pid: The process ID.
+    :return: True if it is running
+    """
+    if sys.platform == "win32":
+        result = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/NH"], capture_output=True, text=True)
+        return str(pid) in result.stdout
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+def _command_line(pid: int) -> str:
+    """
+    Returns the command line a process was started with.
+
+    :param pid: The process ID.
+    :return: The command line, or an empty string if it can't be read
+    """
+    if sys.platform == "win32":
+        result = subprocess.run([
+            "powershell", "-NoProfile", "-Command",
+            f"(Get-CimInstance Win32_Process -Filter \"ProcessId = {int(pid)}\").CommandLine"
+        ], capture_output=True, text=True)
+        return result.stdout.strip()
+
+    if os.path.exists(f"/proc/{pid}/cmdline"):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as file:
+                return file.read().replace(b"\0", b" ").decode(errors="replace")
+        except OSError:
+            return ""
+
+    result = subprocess.run(["ps", "-ww", "-o", "command=", "-p", str(pid)], capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+class BrowserDaemon:
+    def __init__(self, chrome_settings: dict) -> None:
+        """
+        A Chrome kept running between runs, with remote debugging on a local
+        port, so runs attach to a warm browser instead of starting one.
+
+        Only the Chrome started here is ever stopped, other Chrome processes
+        on the machine are left alone.
+
+        :param chrome_settings: The `chrome` settings.
+        """
+        daemon_settings = chrome_settings.get("daemon", {})
+
+        self.chrome_settings = chrome_settings
+        self.port = daemon_settings.get("port", 9222)
+        self.startup_timeout = daemon_settings.get("startupTimeout", 20)
+        self.profile_dir = os.path.abspath(daemon_settings.get("profileDir", DAEMON_PROFILE_DIR))
+        self.address = f"127.0.0.1:{self.port}"
+
+    def _read_state(self) -> dict:
+        # Helper function to read the PID and port of the Chrome started earlier
+        if not os.path.exists(DAEMON_STATE_PATH):
+            return {}
+
+        with open(DAEMON_STATE_PATH) as file:
+            return json.load(file)
+
+    def _flags(self, port: int, profile_dir: str) -> list:
+        # Helper function to list the arguments that tell the daemon's Chrome apart from any other
+        return [f"--remote-debugging-port={port}", f"--user-data-dir={profile_dir}"]
+
+    def is_healthy(self, timeout: float = 2) -> bool:
+        """
+        Whether Chrome answers on its debugging port.
+
+        :param timeout: Seconds to wait for the answer.
+        :return: True if it is up
+        """
+        try:
+            with urlopen(f"http://{self.address}/json/version", timeout=timeout) as response:
+                return "webSocketDebuggerUrl" in json.load(response)
+        except Exception:
+            return False
+
+    def start(self) -> None:
+        """
+        Starts Chrome in the background, detached from this process so it
+        outlives the run, and waits until it answers.
+        """
+        binary = self.chrome_settings.get("binary") or _find_chrome()
+
+        if not binary:
+            raise RuntimeError("Chrome not found, set chrome.binary in config.json")
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+        arguments = [binary] + self._flags(self.port, self.profile_dir) + [
+            "--remote-debugging-address=127.0.0.1",
+            "--no-first-run",
+            "--no-default-browser-check"
+        ]
+
+        if self.chrome_settings.get("headless"):
+            arguments.append("--headless")
+
+        # Attached drivers can't pass arguments, the daemon has to start with them
+        arguments.extend(browser_arguments(self.chrome_settings.get("lean", {})))
+
+        if sys.platform == "win32":
+            process = subprocess.Popen(arguments, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, \
+                                       creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP)
+        else:
+            process = subprocess.Popen(arguments, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, \
+                                       start_new_session=True)
+
+        with open(DAEMON_STATE_PATH, "w") as file:
+            json.dump({"pid": process.pid, "port": self.port, "profile_dir": self.profile_dir, \
+                       "started_at": time.time()}, file, indent=4)
+
+        deadline = time.monotonic() + self.startup_timeout
+
+        while not self.is_healthy(timeout=1):
+            if process.poll() is not None:
+                self.stop()
+                # Chrome hands the profile to a window already open on it and exits
+                raise RuntimeError("Chrome exited on start, is the daemon profile open in another Chrome window?")
+
+            if time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(f"Chrome didn't answer on port {self.port} within {self.startup_timeout}s")
+
+            time.sleep(0.1)
+
+        print(colored(f"=> Started Browser Daemon on Port {self.port} (PID {process.pid})", "green"))
+
+    def stop(self) -> bool:
+        """
+        Stops the Chrome started by the daemon, if it is still running. The
+        PID in the state file is only trusted while that process still has the
+        daemon's port and profile on its command line, a reused PID is left alone.
+
+        :return: True if a browser was stopped
+        """
+        state = self._read_state()
+        pid = state.get("pid")
+
+        if os.path.exists(DAEMON_STATE_PATH):
+            os.remove(DAEMON_STATE_PATH)
+
+        if not pid or not _is_running(pid):
+            return False
+
+        command_line = _command_line(pid)
+        flags = self._flags(state.get("port", self.port), state.get("profile_dir", self.profile_dir))
+
+        if not all(flag in command_line for flag in flags):
+            print(colored(f"=> PID {pid} is no longer the Browser Daemon, leaving it running.", "yellow"))
+            return False
+
+        if sys.platform == "win32":
+            subprocess.run(["taskkill", "/PID", str(pid), "/T", "/F"], capture_output=True)
+        else:
+            os.killpg(pid, signal.SIGTERM)
+
+        print(colored(f"=> Stopped Browser Daemon (PID {pid})", "green"))
+
+        return True
+
+    def ensure(self) -> str:
+        """
+        Makes sure the browser is up, restarting it if it stopped answering.
+
+        :return: The debugger address to attach to
+        """
+        if self.is_healthy():
+            return self.address
+
+        if self._read_state():
+            print(colored("=> Browser Daemon is not responding, restarting it.", "yellow"))
+            metrics.incr("browser.restarts")
+            self.stop()
+
+        with metrics.span("browser.start"):
+            self.start()
+
+        return self.address
+
+    def attach(self, options: Options = None) -> WebDriver:
+        """
+        Returns a driver attached to the running browser, starting it first
+        if needed.
+
+        :param options: Options for the driver. Browser arguments have no
+            effect, Chrome is already running.
+        :return: The driver
+        """
+        options = options or Options()
+        options.debugger_address = self.ensure()
+
+        with metrics.span("browser.attach"):
+            return WebDriver(options=options, service=Service(get_chromedriver_path()))
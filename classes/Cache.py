@@ -0,0 +1,179 @@
+from config import get_llm_settings
+from typing import Optional
+
+import threading
+import hashlib
+import sqlite3
+import time
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def _normalize_prompt(prompt: str) -> str:
+    """
+    Normalizes a prompt so that whitespace-only differences share a cache entry.
+
+    :param prompt: The prompt.
+    :return: The normalized prompt
+    """
+    return " ".join(prompt.split())
+
+
+class LLMCache:
+    def __init__(self, db_file: str = "llm_cache.db", max_entries: int = 10000, max_age_days: float = 30) -> None:
+        """
+        Persistent cache of LLM responses, keyed by a hash of the model and
+        the normalized prompt.
+
+        :param db_file: SQLite file to store the responses in.
+        :param max_entries: Number of entries kept, least recently used go first.
+        :param max_age_days: Age after which entries are evicted.
+        """
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            response TEXT,
+            created_at REAL,
+            last_used_at REAL
+        )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used_at ON responses (last_used_at)")
+        self.connection.commit()
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        """
+        Returns the cache key of a prompt.
+
+        :param model: Model name.
+        :param prompt: The prompt.
+        :return: Hex SHA-256 of the model and normalized prompt
+        """
+        return hashlib.sha256(f"{model}\0{_normalize_prompt(prompt)}".encode()).hexdigest()
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        """
+        Returns the cached response for a prompt.
+
+        :param model: Model name.
+        :param prompt: The prompt.
+        :return: The response, None on a miss or if the entry expired
+        """
+        key = self.key(model, prompt)
+        now = time.time()
+
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.connection.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+
+        return row[0]
+
+    def set(self, model: str, prompt: str, response: str) -> None:
+        """
+        Stores the response for a prompt, then evicts old entries.
+
+        :param model: Model name.
+        :param prompt: The prompt.
+        :param response: The model's response.
+        """
+        now = time.time()
+
+        with self._lock:
+            with self.connection:
+                self.connection.execute("""
+                INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+                """, (self.key(model, prompt), model, response, now, now))
+
+                self._evict(now)
+
+    def delete(self, model: str, prompt: str) -> None:
+        """
+        Removes the cached response for a prompt, e.g. a rejected cover letter.
+
+        :param model: Model name.
+        :param prompt: The prompt.
+        """
+        with self._lock:
+            with self.connection:
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (self.key(model, prompt),))
+
+    def _evict(self, now: float) -> None:
+        """
+        Deletes expired entries and the least recently used ones over the limit.
+        Must be called with the lock held.
+
+        :param now: Current time.
+        """
+        self.connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age,))
+        self.connection.execute("""
+        DELETE FROM responses WHERE key IN (
+            SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+        )
+        """, (self.max_entries,))
+
+    def stats(self) -> dict:
+        """
+        Returns the hit and miss counters of this process, and the number of entries.
+
+        :return: Dictionary with "hits", "misses" and "entries"
+        """
+        with self._lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        """
+        self.connection.close()
+
+
+def get_llm_cache(cache_settings: dict = None) -> Optional[LLMCache]:
+    """
+    Returns the process-wide LLM cache, configured by `llm.cache`.
+
+    :param cache_settings: Cache settings to use instead of the config.
+    :return: The cache, or None if caching is disabled
+    """
+    global _shared_cache
+
+    if cache_settings is None:
+        cache_settings = get_llm_settings().get("cache", {})
+
+    if not cache_settings.get("enabled", True):
+        return None
+
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMCache(
+                db_file=cache_settings.get("path", "llm_cache.db"),
+                max_entries=cache_settings.get("maxEntries", 10000),
+                max_age_days=cache_settings.get("maxAgeDays", 30)
+            )
+
+    return _shared_cache
@@ -1,14 +1,168 @@
-from typing import List
+from typing import Dict, Iterable, Iterator, List
+from classes.Metrics import metrics
 
+import functools
+import threading
 import json
+import time
 import sqlite3
+import re
+
+JOB_COLUMNS = (
+    "id",
+    "title",
+    "location",
+    "salary",
+    "benefits",
+    "job_description_markdown",
+    "apply_button",
+    "url",
+    "job_key",
+    "discovered_at",
+    "parsed_at",
+    "cluster_id",
+)
+
+# Columns added after the first release, created on existing databases
+MIGRATED_COLUMNS = {
+    "job_key": "TEXT",
+    "discovered_at": "REAL",
+    "parsed_at": "REAL",
+    "cluster_id": "INTEGER",
+}
+
+# Columns indexed for full-text search, with their bm25 weights
+FTS_COLUMNS = {
+    "title": 10.0,
+    "location": 2.0,
+    "job_description_markdown": 1.0,
+}
+
+# Operators of FTS5 queries, every other word is searched as a phrase
+FTS_OPERATORS = ("AND", "OR", "NOT", "NEAR")
+
+# Quoted phrases, parentheses and words of a full-text query
+FTS_TOKEN_PATTERN = re.compile(r'"(?:[^"]|"")*"\*?|[()]|[^\s()"]+')
+
+# States of an application, in order. Any state can move to "failed".
+APPLICATION_STATES = ("discovered", "parsed", "drafted", "letter_ready", "rendered", "sent")
+
+# Columns that get_job can look a job up by
+JOB_SELECTORS = ("id", "job_key", "url")
+
+# Operators accepted in the filters of iter_jobs
+FILTER_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "IS", "IS NOT", "LIKE")
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -16000,
+    "busy_timeout": 5000,
+}
+
+
+def _job_value(job: dict, column: str):
+    """
+    Returns the value to store for a column of a job dictionary.
+
+    :param job: Job dictionary.
+    :param column: Column name.
+    :return: Value to bind, None if the job doesn't have it.
+    """
+    value = job.get(column)
+
+    if column == "benefits" and value is not None:
+        return json.dumps(value)
+
+    return value
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    """
+    Turns a row into a job dictionary, decoding the benefits.
+
+    :param row: Row of the jobs table, any projection.
+    :return: Job dictionary with the selected columns.
+    """
+    job = dict(zip(row.keys(), row))
+
+    if "benefits" in job:
+        job["benefits"] = json.loads(job["benefits"]) if job["benefits"] else None
+
+    return job
+
+
+def _check_columns(columns: Iterable[str]) -> List[str]:
+    """
+    Checks that every column is a column of the jobs table.
+
+    :param columns: Column names.
+    :return: The columns, as a list.
+    """
+    columns = list(columns)
+    unknown = [column for column in columns if column not in JOB_COLUMNS]
+
+    if unknown:
+        raise ValueError(f"Unknown job columns: {', '.join(unknown)}")
+
+    return columns
+
+
+def _fts_query(query: str) -> str:
+    """
+    Quotes every search term of a full-text query, so terms like c++, c#
+    or node.js are searched for instead of read as FTS5 syntax. Operators,
+    parentheses, phrases, column filters and prefix stars keep working.
+
+    :param query: Query, e.g. 'c++ AND (title:senior OR lead*)'.
+    :return: The FTS5 query
+    """
+    tokens = []
+
+    for token in FTS_TOKEN_PATTERN.findall(query):
+        if token in FTS_OPERATORS or token in "()" or token.startswith('"'):
+            tokens.append(token)
+            continue
+
+        column, separator, term = token.partition(":")
+
+        if not separator or column not in FTS_COLUMNS or not term:
+            column, separator, term = "", "", token
+
+        prefix = "*" if term.endswith("*") and len(term) > 1 else ""
+        term = term[:-1] if prefix else term
+
+        phrase = '"' + term.replace('"', '""') + '"'
+        tokens.append(f"{column}{separator}{phrase}{prefix}")
+
+    return " ".join(tokens)
+
+
+def _locked(method):
+    """
+    Runs a Database method while holding the connection lock, so one
+    connection can be shared by the pipeline threads.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
 
 class Database:
     def __init__(self, db_file: str = "jobber.db") -> None:
         self.db_file = db_file
-        self.connection = sqlite3.connect(self.db_file)
+        self.connection = sqlite3.connect(self.db_file, check_same_thread=False)
         self.cursor = self.connection.cursor()
+        self._lock = threading.RLock()
 
+        for pragma, value in PRAGMAS.items():
+            self.cursor.execute(f"PRAGMA {pragma} = {value}")
+
+    @_locked
     def create_table(self) -> None:
         """
         Creates the table if it doesn't exist.
@@ -22,63 +176,415 @@ class Database:
             benefits TEXT,
             job_description_markdown TEXT,
             apply_button TEXT,
-            url TEXT
+            url TEXT,
+            job_key TEXT,
+            discovered_at REAL,
+            parsed_at REAL,
+            cluster_id INTEGER
         )
         """)
 
+        self.cursor.execute("PRAGMA table_info(jobs)")
+        existing_columns = {column[1] for column in self.cursor.fetchall()}
+
+        for column, column_type in MIGRATED_COLUMNS.items():
+            if column not in existing_columns:
+                self.cursor.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+        self.cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_job_key ON jobs (job_key)")
+
+        for column in ("url", "title", "location"):
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_jobs_{column} ON jobs ({column})")
+
+        self._create_fts()
+
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS signatures (
+            job_id INTEGER PRIMARY KEY,
+            signature BLOB,
+            cluster_id INTEGER
+        )
+        """)
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lsh_buckets (
+            band INTEGER,
+            bucket INTEGER,
+            job_id INTEGER
+        )
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_lsh_buckets ON lsh_buckets (band, bucket)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_lsh_buckets_job_id ON lsh_buckets (job_id)")
+
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contacts (
+            domain TEXT PRIMARY KEY,
+            emails TEXT,
+            crawled_at REAL
+        )
+        """)
+
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS applications (
+            job_id INTEGER PRIMARY KEY,
+            state TEXT,
+            attempts INTEGER DEFAULT 0,
+            cover_letter_path TEXT,
+            error TEXT,
+            created_at REAL,
+            updated_at REAL
+        )
+        """)
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS application_events (
+            job_id INTEGER,
+            state TEXT,
+            error TEXT,
+            at REAL
+        )
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_application_events_job_id ON application_events (job_id)")
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sends (
+            job_id INTEGER,
+            recipient TEXT,
+            status TEXT,
+            error TEXT,
+            queued_at REAL,
+            sent_at REAL,
+            UNIQUE (job_id, recipient)
+        )
+        """)
+        self.connection.commit()
+
+    def _create_fts(self) -> None:
+        """
+        Creates the full-text index over the jobs and the triggers keeping it
+        in sync. An index created on an existing database is filled once.
+        """
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'jobs_fts'")
+        exists = self.cursor.fetchone() is not None
+
+        columns = ", ".join(FTS_COLUMNS)
+        new_columns = ", ".join(f"new.{column}" for column in FTS_COLUMNS)
+        old_columns = ", ".join(f"old.{column}" for column in FTS_COLUMNS)
+
+        self.cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts
+        USING fts5({columns}, content='jobs', content_rowid='id')
+        """)
+
+        self.cursor.executescript(f"""
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_insert AFTER INSERT ON jobs BEGIN
+            INSERT INTO jobs_fts (rowid, {columns}) VALUES (new.id, {new_columns});
+        END;
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_delete AFTER DELETE ON jobs BEGIN
+            INSERT INTO jobs_fts (jobs_fts, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+        END;
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_update AFTER UPDATE ON jobs BEGIN
+            INSERT INTO jobs_fts (jobs_fts, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+            INSERT INTO jobs_fts (rowid, {columns}) VALUES (new.id, {new_columns});
+        END;
+        """)
+
+        if not exists:
+            self.cursor.execute("INSERT INTO jobs_fts (jobs_fts) VALUES ('rebuild')")
+
+    @_locked
     def insert_job(self, job: dict) -> None:
         """
         Inserts a job into the database.
 
         :param job: Job dictionary.
         """
-        self.cursor.execute("""
-        INSERT INTO jobs (id, title, location, salary, benefits, job_description_markdown, apply_button, url)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            job["id"],
-            job["title"],
-            job["location"],
-            job["salary"] if "salary" in job else None,
-            json.dumps(job["benefits"]) if "benefits" in job else None,
-            job["job_description_markdown"] if "job_description_markdown" in job else None,
-            job["apply_button"] if "apply_button" in job else None,
-            job["url"]
-        ))
+        columns = ", ".join(JOB_COLUMNS)
+        placeholders = ", ".join("?" for _ in JOB_COLUMNS)
+
+        self.cursor.execute(
+            f"INSERT INTO jobs ({columns}) VALUES ({placeholders})",
+            tuple(_job_value(job, column) for column in JOB_COLUMNS)
+        )
 
         self.connection.commit()
 
+    @_locked
+    def upsert_jobs(self, jobs: Iterable[dict]) -> int:
+        """
+        Inserts or updates many jobs in a single transaction.
+
+        Jobs are matched on their Indeed job key. Existing rows keep their
+        stored value for every field the job dictionary doesn't provide,
+        and always keep the time they were first discovered.
+
+        :param jobs: Job dictionaries, each with a "job_key". Jobs without
+            one are skipped, NULL keys never conflict and would be inserted
+            again on every run.
+        :return: Number of jobs written.
+        """
+        rows = [tuple(_job_value(job, column) for column in JOB_COLUMNS) for job in jobs if job.get("job_key")]
+
+        if not rows:
+            return 0
+
+        columns = ", ".join(JOB_COLUMNS)
+        placeholders = ", ".join("?" for _ in JOB_COLUMNS)
+        updates = ",\n            ".join(
+            f"{column} = COALESCE(jobs.{column}, excluded.{column})" if column == "discovered_at" else
+            f"{column} = COALESCE(excluded.{column}, jobs.{column})"
+            for column in JOB_COLUMNS if column not in ("id", "job_key")
+        )
+
+        with self.connection, metrics.span("db.upsert_jobs"):
+            self.cursor.executemany(f"""
+            INSERT INTO jobs ({columns})
+            VALUES ({placeholders})
+            ON CONFLICT(job_key) DO UPDATE SET
+            {updates}
+            """, rows)
+
+        metrics.incr("db.rows_written", len(rows))
+
+        return len(rows)
+
+    @_locked
     def update_job(self, job: dict) -> None:
         """
         Updates a job in the database.
 
+        Only the fields present in the dictionary are changed.
+
         :param job: Job dictionary.
         """
-        previous_job = self.get_job(job["id"])
+        columns = [column for column in JOB_COLUMNS if column != "id" and column in job]
 
-        self.cursor.execute("""
-        UPDATE jobs
-        SET title = ?,
-            location = ?,
-            salary = ?,
-            benefits = ?,
-            job_description_markdown = ?,
-            apply_button = ?,
-            url = ?
-        WHERE id = ?
-        """, (
-            job["title"] if "title" in job else previous_job["title"],
-            job["location"] if "location" in job else previous_job["location"],
-            job["salary"] if "salary" in job else previous_job["salary"],
-            json.dumps(job["benefits"]) if "benefits" in job else json.dumps(previous_job["benefits"]),
-            job["job_description_markdown"] if "job_description_markdown" in job else previous_job["job_description_markdown"],
-            job["apply_button"] if "apply_button" in job else previous_job["apply_button"],
-            job["url"] if "url" in job else previous_job["url"],
-            job["id"] if "id" in job else previous_job["id"]
-        ))
+        if not columns:
+            return
+
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+
+        self.cursor.execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ?",
+            [_job_value(job, column) for column in columns] + [job["id"]]
+        )
 
         self.connection.commit()
 
+    @_locked
+    def lookup_jobs(self, job_keys: Iterable[str]) -> Dict[str, dict]:
+        """
+        Returns the ID and parse time of the jobs with the given job keys.
+
+        :param job_keys: Indeed job keys.
+        :return: Dictionary of job key to {"id", "parsed_at"}, for known jobs only.
+        """
+        job_keys = [job_key for job_key in job_keys if job_key]
+        found = {}
+
+        for start in range(0, len(job_keys), 500):
+            chunk = job_keys[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+
+            self.cursor.execute(
+                f"SELECT job_key, id, parsed_at FROM jobs WHERE job_key IN ({placeholders})",
+                chunk
+            )
+
+            for job_key, job_id, parsed_at in self.cursor.fetchall():
+                found[job_key] = {"id": job_id, "parsed_at": parsed_at}
+
+        return found
+
+    @_locked
+    def get_contact(self, domain: str) -> dict:
+        """
+        Returns the emails found on a company domain.
+
+        :param domain: Company domain, e.g. example.com.
+        :return: {"emails", "crawled_at"}, or None if the domain wasn't crawled.
+        """
+        self.cursor.execute("SELECT emails, crawled_at FROM contacts WHERE domain = ?", (domain,))
+        contact = self.cursor.fetchone()
+
+        if contact is None:
+            return None
+
+        return {"emails": json.loads(contact[0]), "crawled_at": contact[1]}
+
+    @_locked
+    def set_contact(self, domain: str, emails: List[str], crawled_at: float) -> None:
+        """
+        Stores the emails found on a company domain, even if there were none.
+
+        :param domain: Company domain, e.g. example.com.
+        :param emails: Emails found.
+        :param crawled_at: Time of the crawl.
+        """
+        self.cursor.execute(
+            "INSERT OR REPLACE INTO contacts (domain, emails, crawled_at) VALUES (?, ?, ?)",
+            (domain, json.dumps(emails), crawled_at)
+        )
+        self.connection.commit()
+
+    @_locked
+    def set_signature(self, job_id: int, signature: bytes, buckets: List[int], cluster_id: int) -> None:
+        """
+        Stores the MinHash signature of a job, its LSH bucket in every band
+        and its cluster, replacing the previous ones.
+
+        :param job_id: Job ID.
+        :param signature: Signature bytes.
+        :param buckets: Bucket of each band, in band order.
+        :param cluster_id: ID of the first job of its near-duplicate cluster.
+        """
+        with self.connection:
+            self.cursor.execute("DELETE FROM lsh_buckets WHERE job_id = ?", (job_id,))
+            self.cursor.execute(
+                "INSERT OR REPLACE INTO signatures (job_id, signature, cluster_id) VALUES (?, ?, ?)",
+                (job_id, signature, cluster_id)
+            )
+            self.cursor.executemany(
+                "INSERT INTO lsh_buckets (band, bucket, job_id) VALUES (?, ?, ?)",
+                [(band, bucket, job_id) for band, bucket in enumerate(buckets)]
+            )
+
+    @_locked
+    def find_bucket_neighbours(self, buckets: List[int], exclude: int = None) -> List[tuple]:
+        """
+        Returns the jobs sharing at least one LSH bucket.
+
+        :param buckets: Bucket of each band, in band order.
+        :param exclude: Job ID to leave out, usually the job being looked up.
+
+        :return: List of (job_id, signature, cluster_id) tuples.
+        """
+        conditions = " OR ".join("(band = ? AND bucket = ?)" for _ in buckets)
+        values = [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+
+        self.cursor.execute(f"""
+        SELECT job_id, signature, cluster_id
+        FROM signatures
+        WHERE job_id IN (SELECT job_id FROM lsh_buckets WHERE {conditions})
+        AND job_id IS NOT ?
+        """, values + [exclude])
+
+        return self.cursor.fetchall()
+
+    @_locked
+    def start_applications(self, job_ids: Iterable[int]) -> None:
+        """
+        Tracks jobs as discovered, unless they are tracked already.
+
+        :param job_ids: Job IDs.
+        """
+        now = time.time()
+        rows = [(job_id, now, now) for job_id in job_ids]
+
+        with self.connection:
+            self.cursor.executemany("""
+            INSERT OR IGNORE INTO applications (job_id, state, attempts, created_at, updated_at)
+            VALUES (?, 'discovered', 0, ?, ?)
+            """, rows)
+
+    @_locked
+    def set_application_state(self, job_id: int, state: str, cover_letter_path: str = None, \
+                              error: str = None) -> None:
+        """
+        Moves an application to a new state and logs the transition. Moving
+        to "failed" counts one more attempt.
+
+        :param job_id: Job ID.
+        :param state: One of APPLICATION_STATES, or "failed".
+        :param cover_letter_path: Path of the cover letter, kept if not given.
+        :param error: Why the application failed.
+        """
+        if state not in APPLICATION_STATES and state != "failed":
+            raise ValueError(f"Unknown application state: {state}")
+
+        now = time.time()
+
+        with self.connection:
+            self.cursor.execute("""
+            INSERT INTO applications (job_id, state, attempts, cover_letter_path, error, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(job_id) DO UPDATE SET
+            state = excluded.state,
+            attempts = applications.attempts + excluded.attempts,
+            cover_letter_path = COALESCE(excluded.cover_letter_path, applications.cover_letter_path),
+            error = excluded.error,
+            updated_at = excluded.updated_at
+            """, (job_id, state, int(state == "failed"), cover_letter_path, error, now, now))
+
+            self.cursor.execute(
+                "INSERT INTO application_events (job_id, state, error, at) VALUES (?, ?, ?, ?)",
+                (job_id, state, error, now)
+            )
+
+    @_locked
+    def get_application(self, job_id: int) -> dict:
+        """
+        Returns the state of an application.
+
+        :param job_id: Job ID.
+        :return: {"job_id", "state", "attempts", "cover_letter_path", "error",
+            "created_at", "updated_at"}, or None if the job isn't tracked.
+        """
+        cursor = self.connection.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("SELECT * FROM applications WHERE job_id = ?", (job_id,))
+        application = cursor.fetchone()
+
+        return dict(application) if application else None
+
+    @_locked
+    def count_applications(self) -> Dict[str, int]:
+        """
+        Counts the applications in every state.
+
+        :return: Dictionary of state to number of applications.
+        """
+        self.cursor.execute("SELECT state, COUNT(*) FROM applications GROUP BY state")
+
+        return dict(self.cursor.fetchall())
+
+    @_locked
+    def claim_send(self, job_id: int, recipient: str) -> bool:
+        """
+        Reserves the right to email a recipient about a job. Succeeds once
+        per (job, recipient), or again after a failed send. A send left
+        queued by a crash is never retried, it may have gone out.
+
+        :param job_id: Job ID.
+        :param recipient: Email address.
+        :return: True if the email should be sent.
+        """
+        with self.connection:
+            self.cursor.execute("""
+            INSERT INTO sends (job_id, recipient, status, queued_at) VALUES (?, ?, 'queued', ?)
+            ON CONFLICT(job_id, recipient) DO UPDATE SET
+            status = 'queued',
+            error = NULL,
+            queued_at = excluded.queued_at
+            WHERE sends.status = 'failed'
+            """, (job_id, recipient, time.time()))
+
+            return self.cursor.rowcount > 0
+
+    @_locked
+    def set_send_status(self, job_id: int, recipient: str, status: str, error: str = None) -> None:
+        """
+        Records the outcome of a send.
+
+        :param job_id: Job ID.
+        :param recipient: Email address.
+        :param status: "sent" or "failed".
+        :param error: Why the send failed.
+        """
+        with self.connection:
+            self.cursor.execute(
+                "UPDATE sends SET status = ?, error = ?, sent_at = ? WHERE job_id = ? AND recipient = ?",
+                (status, error, time.time() if status == "sent" else None, job_id, recipient)
+            )
+
+    @_locked
     def delete_job(self, job_id: int) -> None:
         """
         Deletes a job from the database.
@@ -86,58 +592,143 @@ class Database:
         :param job_id: Job ID.
         """
         self.cursor.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        self.cursor.execute("DELETE FROM signatures WHERE job_id = ?", (job_id,))
+        self.cursor.execute("DELETE FROM lsh_buckets WHERE job_id = ?", (job_id,))
         self.connection.commit()
 
-    def get_job(self, query: str, selector: str = "id") -> dict:
+    def iter_jobs(self, columns: Iterable[str] = None, filters: dict = None, \
+                  page_size: int = 500) -> Iterator[sqlite3.Row]:
         """
-        Returns a job from the database.
+        Streams jobs from the database, one page of rows at a time.
 
-        :param query: Query string.
-        :param selector: Selector.
-        :return: Job dictionary.
+        Pages are read by ID (keyset pagination), so every page is an index
+        range scan no matter how deep into the table it is.
+
+        :param columns: Columns to read. Defaults to every column; leave out
+            job_description_markdown when the descriptions aren't needed.
+        :param filters: Dictionary of column to value, or to an
+            (operator, value) tuple, e.g. {"parsed_at": (">=", since)}.
+        :param page_size: Number of rows fetched per query.
+
+        :return: Iterator of sqlite3.Row, indexable by column name. Benefits
+            are the stored JSON string.
+        """
+        columns = _check_columns(columns or JOB_COLUMNS)
+        selected = columns if "id" in columns else ["id"] + columns
+
+        conditions = ["id > ?"]
+        values = []
+
+        for column, value in (filters or {}).items():
+            _check_columns([column])
+            operator, value = value if isinstance(value, tuple) else ("IS" if value is None else "=", value)
+
+            if operator.upper() not in FILTER_OPERATORS:
+                raise ValueError(f"Unknown filter operator: {operator}")
+
+            conditions.append(f"{column} {operator.upper()} ?")
+            values.append(value)
+
+        query = f"SELECT {', '.join(selected)} FROM jobs WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?"
+
+        cursor = self.connection.cursor()
+        cursor.row_factory = sqlite3.Row
+        last_id = 0
+
+        while True:
+            with self._lock:
+                rows = cursor.execute(query, [last_id] + values + [page_size]).fetchall()
+
+            for row in rows:
+                yield row
+
+            if len(rows) < page_size:
+                return
+
+            last_id = rows[-1]["id"]
+
+    @_locked
+    def search_jobs(self, query: str, limit: int = 100, columns: Iterable[str] = None, \
+                    job_ids: Iterable[int] = None) -> List[dict]:
         """
-        print(self.get_jobs())
-        self.cursor.execute(f"SELECT * FROM jobs WHERE {selector} = ?", (query,))
-        job = self.cursor.fetchone()
-        job_dict = {
-            "id": job[0],
-            "title": job[1],
-            "location": job[2],
-            "salary": job[3],
-            "benefits": json.loads(job[4]),
-            "job_description_markdown": job[5],
-            "apply_button": job[6],
-            "url": job[7]
-        }
+        Finds the jobs matching a full-text query, best matches first.
+
+        Matches in the title weigh more than in the location, which weigh
+        more than in the description.
 
-        return job_dict
+        :param query: FTS5 query, e.g. 'python AND (django OR flask) NOT senior'.
+            Terms are quoted, see `_fts_query`.
+        :param limit: Maximum number of jobs to return.
+        :param columns: Columns to read. Defaults to every column.
+        :param job_ids: Only search among these jobs.
 
-    def get_jobs(self) -> List[dict]:
+        :raises ValueError: If the query isn't valid, e.g. has an unclosed parenthesis.
+        :return: Job dictionaries with their bm25 "rank", lower is better.
         """
-        Returns all jobs from the database.
+        columns = _check_columns(columns or JOB_COLUMNS)
+        selected = ", ".join(f"jobs.{column}" for column in columns)
+        weights = ", ".join(str(weight) for weight in FTS_COLUMNS.values())
 
-        :return: List of jobs.
+        restriction, values = "", []
+
+        if job_ids is not None:
+            values = [int(job_id) for job_id in job_ids]
+            restriction = f"AND jobs_fts.rowid IN ({', '.join('?' for _ in values)})"
+
+        with metrics.span("db.search_jobs"):
+            cursor = self.connection.cursor()
+            cursor.row_factory = sqlite3.Row
+
+            try:
+                cursor.execute(f"""
+                SELECT {selected}, bm25(jobs_fts, {weights}) AS rank
+                FROM jobs_fts
+                JOIN jobs ON jobs.id = jobs_fts.rowid
+                WHERE jobs_fts MATCH ? {restriction}
+                ORDER BY rank
+                LIMIT ?
+                """, [_fts_query(query)] + values + [limit])
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"Invalid search query \"{query}\": {e}") from e
+
+            rows = cursor.fetchall()
+
+        return [_row_to_job(row) for row in rows]
+
+    @_locked
+    def get_job(self, query: str, selector: str = "id", columns: Iterable[str] = None) -> dict:
+        """
+        Returns a job from the database.
+
+        :param query: Query string.
+        :param selector: Column to look the job up by, one of JOB_SELECTORS.
+        :param columns: Columns to read. Defaults to every column.
+        :return: Job dictionary, None if not found.
         """
-        self.cursor.execute("SELECT * FROM jobs")
-        jobs = self.cursor.fetchall()
+        if selector not in JOB_SELECTORS:
+            raise ValueError(f"Can't look jobs up by {selector}")
+
+        columns = _check_columns(columns or JOB_COLUMNS)
+
+        cursor = self.connection.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(f"SELECT {', '.join(columns)} FROM jobs WHERE {selector} = ? LIMIT 1", (query,))
+        job = cursor.fetchone()
 
-        jobs_list = []
+        if job is None:
+            return None
 
-        for job in jobs:
-            job_dict = {
-                "id": job[0],
-                "title": job[1],
-                "location": job[2],
-                "salary": job[3],
-                "benefits": json.loads(job[4]) if job[4] else None,
-                "job_description_markdown": job[5],
-                "apply_button": job[6],
-                "url": job[7]
-            }
+        return _row_to_job(job)
 
-            jobs_list.append(job_dict)
+    def get_jobs(self, columns: Iterable[str] = None, filters: dict = None) -> List[dict]:
+        """
+        Returns all jobs from the database. Prefer iter_jobs for large tables.
 
-        return jobs_list
+        :param columns: Columns to read. Defaults to every column.
+        :param filters: Filters, as in iter_jobs.
+        :return: List of jobs.
+        """
+        return [_row_to_job(row) for row in self.iter_jobs(columns, filters)]
 
     def close(self) -> None:
         """
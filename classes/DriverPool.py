@@ -0,0 +1,191 @@
+from selenium.webdriver.chrome.webdriver import WebDriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, Tuple, Any
+from classes.LeanBrowsing import enable_lean_mode, lean_options, network_stats
+
+import threading
+import tempfile
+import shutil
+import json
+import os
+
+# Where the resolved chromedriver is remembered between runs
+DRIVER_MANIFEST_PATH = "driver_manifest.json"
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def _major_version(version: str) -> str:
+    # Helper function to get the major version, chromedriver has to match Chrome's
+    return version.split(".")[0] if version else None
+
+
+def get_chromedriver_path() -> str:
+    """
+    Returns the path of a chromedriver matching the installed Chrome.
+
+    The path is remembered in driver_manifest.json, together with the Chrome
+    version it was resolved for, and only resolved again with
+    webdriver_manager, which checks online, when the driver is gone or Chrome
+    was updated to a new major version.
+
+    :return: Path to the chromedriver binary
+    """
+    global _driver_path
+
+    with _driver_path_lock:
+        if _driver_path is not None:
+            return _driver_path
+
+        from webdriver_manager.core.os_manager import OperationSystemManager, ChromeType
+
+        browser_version = OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+
+        manifest = {}
+        if os.path.exists(DRIVER_MANIFEST_PATH):
+            with open(DRIVER_MANIFEST_PATH) as file:
+                manifest = json.load(file)
+
+        # Without a detectable Chrome, trust the driver that is there
+        if manifest.get("path") and os.path.exists(manifest["path"]) and \
+                (browser_version is None or
+                 _major_version(manifest.get("browser_version")) == _major_version(browser_version)):
+            _driver_path = manifest["path"]
+            return _driver_path
+
+        # webdriver_manager is slow to import, only load it to resolve a new driver
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        _driver_path = ChromeDriverManager().install()
+
+        with open(DRIVER_MANIFEST_PATH, "w") as file:
+            json.dump({"path": _driver_path, "browser_version": browser_version}, file, indent=4)
+
+        return _driver_path
+
+
+class DriverPool:
+    def __init__(self, size: int = 2, headless: bool = True, lean_settings: dict = None) -> None:
+        """
+        Pool of Chrome workers, each with its own temporary profile.
+
+        Drivers are started lazily, one per worker thread, and are reused
+        for every page that thread parses.
+
+        :param size: Number of parallel Chrome instances.
+        :param headless: Whether the workers should run headless.
+        :param lean_settings: The `chrome.lean` settings, if enabled the
+            workers don't download images, fonts, media and trackers.
+        """
+        self.size = max(1, int(size))
+        self.headless = headless
+        self.lean_settings = lean_settings if lean_settings and lean_settings.get("enabled") else None
+        self.executable_path = get_chromedriver_path()
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._drivers = []
+        self._profiles = []
+
+        # Kept between map calls, so its threads keep their drivers
+        self._executor = None
+
+    def get_driver(self) -> WebDriver:
+        """
+        Returns the driver of the calling thread, starting it if needed.
+        Lets threads managed elsewhere, e.g. pipeline workers, use the pool.
+
+        :return: WebDriver bound to the current thread.
+        """
+        driver = getattr(self._local, "driver", None)
+
+        if driver is None:
+            profile_dir = tempfile.mkdtemp(prefix="jobber-chrome-")
+
+            options = Options()
+            if self.headless:
+                options.add_argument("--headless")
+            options.add_argument(f"--user-data-dir={profile_dir}")
+
+            if self.lean_settings:
+                lean_options(options, self.lean_settings)
+
+            driver = WebDriver(options=options, service=Service(self.executable_path))
+
+            if self.lean_settings:
+                enable_lean_mode(driver, self.lean_settings)
+
+            with self._lock:
+                self._drivers.append(driver)
+                self._profiles.append(profile_dir)
+
+            self._local.driver = driver
+
+        return driver
+
+    def map(self, func: Callable[[Any, WebDriver], Any], items: Iterable[Any]) -> Iterator[Tuple[Any, Any]]:
+        """
+        Runs `func(item, driver)` for every item across the pool. Workers
+        and their drivers are reused by later calls until the pool is closed.
+
+        :param func: Function to run, receives the item and a worker driver.
+        :param items: Items to process.
+
+        :return: Iterator of (item, result) tuples, in completion order.
+        """
+        return self.run(lambda item: func(item, self.get_driver()), items)
+
+    def run(self, func: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Tuple[Any, Any]]:
+        """
+        Runs `func(item)` for every item on the pool's workers. Unlike `map`,
+        a worker only starts Chrome once `func` calls `get_driver`.
+
+        :param func: Function to run, receives the item.
+        :param items: Items to process.
+
+        :return: Iterator of (item, result) tuples, in completion order.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="jobber-chrome")
+
+            executor = self._executor
+
+        futures = {executor.submit(func, item): item for item in items}
+
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def close(self) -> None:
+        """
+        Quits every worker driver and removes their temporary profiles.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+        with self._lock:
+            for driver in self._drivers:
+                network_stats.release(driver)
+
+                try:
+                    driver.quit()
+                except:
+                    pass
+
+            for profile_dir in self._profiles:
+                shutil.rmtree(profile_dir, ignore_errors=True)
+
+            self._drivers = []
+            self._profiles = []
+
+    def __enter__(self) -> "DriverPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
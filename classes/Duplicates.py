@@ -0,0 +1,125 @@
+from classes.Database import Database
+from typing import List, Tuple
+
+import numpy as np
+import hashlib
+import zlib
+import re
+
+# splitmix64 constants, see _mix
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX_2 = np.uint64(0x94D049BB133111EB)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _shingles(text: str, size: int) -> np.ndarray:
+    """
+    Hashes the overlapping word n-grams of a text.
+
+    :param text: The text.
+    :param size: Number of words per shingle.
+    :return: Array of 32-bit shingle hashes, deduplicated
+    """
+    words = WORD_PATTERN.findall((text or "").lower())
+
+    if len(words) <= size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = {" ".join(words[index:index + size]) for index in range(len(words) - size + 1)}
+
+    return np.array([zlib.crc32(shingle.encode()) for shingle in shingles], dtype=np.uint64)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """
+    Scrambles 64-bit values with the splitmix64 finalizer. Each seed XORed
+    into the input gives an independent hash function; multiplications wrap
+    around on purpose.
+
+    :param values: Array of uint64.
+    :return: Array of uint64 of the same shape
+    """
+    values = values + GOLDEN_GAMMA
+    values = (values ^ (values >> np.uint64(30))) * MIX_1
+    values = (values ^ (values >> np.uint64(27))) * MIX_2
+
+    return values ^ (values >> np.uint64(31))
+
+
+class DuplicateIndex:
+    def __init__(self, db: Database, threshold: float = 0.8, num_perm: int = 128, \
+                 bands: int = 32, shingle_size: int = 5) -> None:
+        """
+        Incremental near-duplicate index over job descriptions, built from
+        MinHash signatures and LSH buckets stored in the database.
+
+        A new description is only compared with the jobs sharing one of its
+        buckets, never with every job.
+
+        :param db: Database storing signatures, buckets and clusters.
+        :param threshold: Estimated Jaccard similarity at which two jobs are duplicates.
+        :param num_perm: Number of hash functions per signature.
+        :param bands: Number of LSH bands, must divide num_perm.
+        :param shingle_size: Number of words per shingle.
+        """
+        if num_perm % bands:
+            raise ValueError("The number of bands must divide num_perm")
+
+        self.db = db
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+
+        # Fixed seed, signatures are stored and must stay comparable between runs
+        self._seeds = np.random.default_rng(1).integers(0, 1 << 63, num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Computes the MinHash signature of a text.
+
+        :param text: The text.
+        :return: Array of num_perm minimum hashes
+        """
+        hashes = _shingles(text, self.shingle_size)
+
+        return _mix(self._seeds[:, None] ^ hashes).min(axis=1)
+
+    def buckets(self, signature: np.ndarray) -> List[int]:
+        """
+        Hashes each band of a signature to its LSH bucket.
+
+        :param signature: MinHash signature.
+        :return: Bucket of each band, as signed 64-bit integers
+        """
+        return [
+            int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "little", signed=True)
+            for band in np.split(signature, self.bands)
+        ]
+
+    def add(self, job_id: int, text: str) -> Tuple[int, float]:
+        """
+        Indexes a job and finds the cluster it belongs to: the cluster of
+        its most similar duplicate, or a new cluster named after the job.
+
+        :param job_id: Job ID.
+        :param text: The job description.
+
+        :return: (cluster_id, similarity to the closest duplicate, 0 if none)
+        """
+        signature = self.signature(text)
+        buckets = self.buckets(signature)
+
+        cluster_id, best = job_id, 0.0
+
+        for other_id, other_signature, other_cluster in self.db.find_bucket_neighbours(buckets, exclude=job_id):
+            similarity = float(np.mean(signature == np.frombuffer(other_signature, dtype=np.uint64)))
+
+            if similarity >= self.threshold and similarity > best:
+                cluster_id, best = other_cluster or other_id, similarity
+
+        self.db.set_signature(job_id, signature.tobytes(), buckets, cluster_id)
+
+        return cluster_id, best
@@ -0,0 +1,402 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import get_crawler_settings
+from classes.Database import Database
+from classes.Metrics import metrics
+from urllib.parse import urljoin, urlparse
+from lxml import html as lxml_html
+from curl_cffi import requests
+from termcolor import colored
+from typing import Dict, Iterable, List, Set
+
+import threading
+import time
+import re
+
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+# Matches of EMAIL_PATTERN that are really file names, e.g. logo@2x.png
+FILE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".css", ".js")
+
+# Links to these domains never lead to the employer's contact address
+IGNORED_DOMAINS = (
+    "indeed.com",
+    "google.com",
+    "facebook.com",
+    "twitter.com",
+    "x.com",
+    "linkedin.com",
+    "instagram.com",
+    "youtube.com",
+    "glassdoor.com",
+    "apple.com",
+)
+
+# Applicant tracking and career site hosts shared by many employers. Each
+# employer lives under its own first path segment, e.g. jobs.lever.co/acme,
+# and addresses at these domains are the vendor's, never the employer's
+SHARED_HOSTS = (
+    "lever.co",
+    "greenhouse.io",
+    "myworkdayjobs.com",
+    "myworkdaysite.com",
+    "workday.com",
+    "ashbyhq.com",
+    "smartrecruiters.com",
+    "workable.com",
+    "jobvite.com",
+    "icims.com",
+    "bamboohr.com",
+    "recruitee.com",
+    "teamtailor.com",
+    "breezy.hr",
+    "applytojob.com",
+    "jazzhr.com",
+    "personio.de",
+    "personio.com",
+    "taleo.net",
+    "successfactors.com",
+    "ultipro.com",
+    "paylocity.com",
+    "adp.com",
+    "dayforcehcm.com",
+    "rippling.com",
+    "pinpointhq.com",
+    "join.com",
+    "wellfound.com",
+    "ziprecruiter.com",
+    "monster.com",
+)
+
+# Addresses that never reach whoever is hiring
+UNWANTED_LOCAL_PARTS = ("noreply", "no-reply", "donotreply", "do-not-reply", "privacy", "abuse", "postmaster", \
+                        "webmaster", "hostmaster", "security", "legal", "gdpr", "dpo", "unsubscribe", "tracking")
+
+# Addresses meant for applications, preferred in this order
+PREFERRED_LOCAL_PARTS = ("jobs", "career", "recruit", "talent", "hiring", "apply", "hr", "people")
+
+# Page parts whose text is code, never contact details
+NON_CONTENT_TAGS = ("script", "style", "noscript", "template")
+
+# Links whose URL contains one of these are crawled first
+CONTACT_HINTS = ("contact", "kontakt", "impressum", "imprint", "about", "career", "jobs", "team")
+
+
+def _domain(url: str) -> str:
+    """
+    Returns the host of a URL, without a leading "www.".
+
+    :param url: The URL.
+    :return: The domain, lower case
+    """
+    host = (urlparse(url).hostname or "").lower()
+
+    return host[4:] if host.startswith("www.") else host
+
+
+def _matches(domain: str, domains: Iterable[str]) -> bool:
+    # Helper function to check whether a domain is one of the domains or a subdomain of one
+    return any(domain == other or domain.endswith("." + other) for other in domains)
+
+
+def _is_ignored(domain: str) -> bool:
+    # Helper function to check whether a domain is one of the IGNORED_DOMAINS or a subdomain of one
+    return _matches(domain, IGNORED_DOMAINS)
+
+
+def _contact_key(url: str) -> str:
+    """
+    Returns what identifies the employer behind a link, for caching and
+    scoping crawls: the domain, or on SHARED_HOSTS the domain and the first
+    path segment.
+
+    :param url: The URL.
+    :return: E.g. "acme.com" or "jobs.lever.co/acme", None if the link
+        doesn't point at one employer
+    """
+    domain = _domain(url)
+
+    if not domain or _is_ignored(domain):
+        return None
+
+    if not _matches(domain, SHARED_HOSTS):
+        return domain
+
+    segment = urlparse(url).path.strip("/").split("/")[0]
+
+    return f"{domain}/{segment.lower()}" if segment else None
+
+
+def extract_emails(page_html: str, within: str = None) -> List[str]:
+    """
+    Finds the email addresses in mailto: links and in the visible text of a
+    page. Scripts and styles are skipped, and so are addresses at
+    IGNORED_DOMAINS and SHARED_HOSTS.
+
+    :param page_html: HTML of the page.
+    :param within: XPath of the part of the page to search, e.g. the job
+        description. Defaults to the whole page.
+    :return: The emails, in the order they appear
+    """
+    if not page_html or not page_html.strip():
+        return []
+
+    tree = lxml_html.fromstring(page_html)
+
+    for node in tree.xpath("|".join(f"//{tag}" for tag in NON_CONTENT_TAGS)):
+        node.drop_tree()
+
+    roots = tree.xpath(within) if within else [tree]
+    candidates = []
+
+    for root in roots:
+        for href in root.xpath(".//a[starts-with(translate(@href, 'MAILTO', 'mailto'), 'mailto:')]/@href"):
+            candidates.append(href[len("mailto:"):].split("?")[0].strip())
+
+        candidates.extend(EMAIL_PATTERN.findall(root.text_content()))
+
+    emails = []
+
+    for email in candidates:
+        email = email.lower()
+
+        if EMAIL_PATTERN.fullmatch(email) and not email.endswith(FILE_SUFFIXES) and \
+                not _matches(email.split("@")[1], IGNORED_DOMAINS + SHARED_HOSTS) and email not in emails:
+            emails.append(email)
+
+    return emails
+
+
+def rank_emails(emails: Iterable[str]) -> List[str]:
+    """
+    Orders contact emails by how likely they reach whoever is hiring:
+    application addresses such as jobs@ first, then the rest in the order
+    they were found. Addresses like noreply@ or privacy@ are dropped.
+
+    :param emails: The emails.
+    :return: The usable emails, best first
+    """
+    ranked = []
+
+    for index, email in enumerate(emails):
+        local_part = email.split("@")[0]
+
+        if any(unwanted in local_part for unwanted in UNWANTED_LOCAL_PARTS):
+            continue
+
+        preference = next((rank for rank, preferred in enumerate(PREFERRED_LOCAL_PARTS) \
+                           if preferred in local_part), len(PREFERRED_LOCAL_PARTS))
+        ranked.append((preference, index, email))
+
+    return [email for _, _, email in sorted(ranked)]
+
+
+def extract_links(page_html: str, base_url: str) -> List[str]:
+    """
+    Returns the absolute http(s) links of a page, without fragments.
+
+    :param page_html: HTML of the page.
+    :param base_url: URL of the page.
+    :return: The links, deduplicated
+    """
+    if not page_html or not page_html.strip():
+        return []
+
+    links = []
+
+    for href in lxml_html.fromstring(page_html).xpath("//a/@href"):
+        link = urljoin(base_url, href.strip()).split("#")[0]
+
+        if link.startswith(("http://", "https://")) and link not in links:
+            links.append(link)
+
+    return links
+
+
+class EmailCrawler:
+    def __init__(self, db: Database = None, crawler_settings: dict = None) -> None:
+        """
+        Crawls company websites over HTTP to find contact emails.
+
+        Crawls are bounded in depth, pages and concurrency, with a separate
+        cap per domain. Results are cached per company domain in the
+        database, so many jobs at the same employer only crawl once.
+
+        :param db: Database to cache the results in.
+        :param crawler_settings: Crawler settings to use instead of the config.
+        """
+        settings = get_crawler_settings() if crawler_settings is None else crawler_settings
+
+        self.db = db
+        self.max_depth = settings.get("maxDepth", 1)
+        self.max_pages = settings.get("maxPages", 20)
+        self.concurrency = settings.get("concurrency", 8)
+        self.per_domain = settings.get("perDomain", 2)
+        self.timeout = settings.get("timeout", 10)
+        self.cache_age = settings.get("cacheDays", 30) * 86400
+        self.max_recipients = settings.get("maxRecipients", 1)
+
+        self._local = threading.local()
+        self._domain_limits = {}
+        self._domain_limits_lock = threading.Lock()
+
+        # Crawls running right now, per company domain
+        self._in_flight: Dict[str, Future] = {}
+        self._in_flight_lock = threading.Lock()
+
+    def _get_session(self) -> requests.Session:
+        # Helper function to get the HTTP session of the calling thread
+        session = getattr(self._local, "session", None)
+
+        if session is None:
+            session = requests.Session(impersonate="chrome")
+            self._local.session = session
+
+        return session
+
+    def _domain_limit(self, domain: str) -> threading.Semaphore:
+        # Helper function to get the semaphore capping requests to a domain
+        with self._domain_limits_lock:
+            if domain not in self._domain_limits:
+                self._domain_limits[domain] = threading.Semaphore(self.per_domain)
+
+            return self._domain_limits[domain]
+
+    def _fetch(self, url: str) -> str:
+        """
+        Fetches a page, waiting for a free slot on its domain.
+
+        :param url: The URL.
+        :return: The HTML, or an empty string if the page couldn't be fetched
+        """
+        with self._domain_limit(_domain(url)):
+            try:
+                response = self._get_session().get(url, timeout=self.timeout)
+            except Exception:
+                return ""
+
+        if response.status_code != 200 or "html" not in response.headers.get("Content-Type", "html"):
+            return ""
+
+        return response.text
+
+    def crawl(self, seeds: Iterable[str]) -> List[str]:
+        """
+        Crawls breadth first from the seed URLs, following links to the same
+        employers, see `_contact_key`, and stops after the first depth where
+        emails were found.
+
+        :param seeds: URLs to start from.
+        :return: The emails found
+        """
+        frontier = list(dict.fromkeys(seeds))
+        keys = {_contact_key(url) for url in frontier} - {None}
+        visited = set()
+        emails = []
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for depth in range(self.max_depth + 1):
+                frontier = [url for url in frontier if url not in visited]
+                frontier = frontier[:self.max_pages - len(visited)]
+
+                if not frontier:
+                    break
+
+                visited.update(frontier)
+                pages = executor.map(self._fetch, frontier)
+
+                next_frontier = []
+
+                for url, page_html in zip(frontier, pages):
+                    for email in extract_emails(page_html):
+                        if email not in emails:
+                            emails.append(email)
+
+                    next_frontier.extend(
+                        link for link in extract_links(page_html, url)
+                        if _contact_key(link) in keys
+                    )
+
+                if emails:
+                    break
+
+                # Contact and about pages first
+                frontier = sorted(
+                    dict.fromkeys(next_frontier),
+                    key=lambda link: not any(hint in link.lower() for hint in CONTACT_HINTS)
+                )
+
+        return emails
+
+    def find_emails(self, urls: Iterable[str]) -> List[str]:
+        """
+        Finds contact emails for the employers among the given links, one
+        per company domain or per employer on SHARED_HOSTS. Employers crawled
+        within `cacheDays` are answered from the cache.
+
+        :param urls: Outbound links of a job page.
+        :return: The emails found, across every employer
+        """
+        seeds: Dict[str, List[str]] = {}
+
+        for url in urls:
+            key = _contact_key(url)
+
+            if key:
+                seeds.setdefault(key, []).append(url)
+
+        emails = []
+
+        for key, key_seeds in seeds.items():
+            found = self._domain_emails(key, key_seeds)
+            emails.extend(email for email in found if email not in emails)
+
+        return emails
+
+    def _domain_emails(self, domain: str, seeds: List[str]) -> List[str]:
+        """
+        Returns the emails of an employer, from the cache or a crawl. Jobs
+        at the same employer applied to at the same time share one crawl:
+        while an employer is being crawled, other threads wait for it.
+
+        :param domain: The employer, as returned by `_contact_key`.
+        :param seeds: Links to the employer to start from.
+        :return: The emails found
+        """
+        with self._in_flight_lock:
+            future = self._in_flight.get(domain)
+            crawling = future is None
+
+            if crawling:
+                future = self._in_flight[domain] = Future()
+
+        if not crawling:
+            print(colored(f"\t=> Waiting for the crawl of {domain}", "blue"))
+            metrics.incr("crawler.shared_crawls")
+            return future.result()
+
+        try:
+            contact = self.db.get_contact(domain) if self.db else None
+
+            if contact and contact["crawled_at"] >= time.time() - self.cache_age:
+                print(colored(f"\t=> Using cached emails for {domain}", "blue"))
+                metrics.incr("crawler.cache_hits")
+                found = contact["emails"]
+            else:
+                print(colored(f"\t=> Crawling {domain} for emails", "blue"))
+                metrics.incr("crawler.cache_misses")
+                # Always include the homepage, contact links are usually there. On
+                # shared hosts that is the employer's board, not the vendor's site.
+                found = self.crawl(seeds + [f"https://{domain}/"])
+
+                if self.db:
+                    self.db.set_contact(domain, found, time.time())
+
+            future.set_result(found)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[domain]
+
+        return found
@@ -1,31 +1,229 @@
-from g4f.client import Client
-from g4f.Provider import AiAsk
+from classes.Cache import get_llm_cache
+from classes.Metrics import metrics
+from config import get_llm_settings
+from typing import TYPE_CHECKING
+
+import threading
+import random
+import time
+
+# curl_cffi is slow to import and only needed with `baseUrl`
+if TYPE_CHECKING:
+    from curl_cffi import requests
+
+
+class TokenBucket:
+    def __init__(self, requests_per_minute: float, burst: int = 1) -> None:
+        """
+        Thread-safe token bucket limiting how often requests are sent.
+
+        :param requests_per_minute: Sustained rate, 0 disables the limit.
+        :param burst: Number of requests that may be sent back to back.
+        """
+        self.rate = requests_per_minute / 60
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until a request may be sent.
+        """
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """
+    Returns whether a failed request is worth retrying: network errors,
+    timeouts, rate limits and server errors are, other client errors aren't.
+
+    :param error: The exception raised by the request.
+    :return: True if the request should be retried
+    """
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+
+    # Connection errors carry no response, or one without a status
+    if not status_code:
+        return True
+
+    return status_code == 429 or status_code >= 500
+
 
 class GPT:
-    def __init__(self) -> None:
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, llm_settings: dict = None) -> None:
         """
         Constructor for GPT class.
+
+        :param llm_settings: LLM settings to use instead of the config.
+        """
+        settings = get_llm_settings() if llm_settings is None else llm_settings
+
+        self.base_model = settings.get("model", "gpt-3.5-turbo")
+        self.base_url = (settings.get("baseUrl") or "").rstrip("/")
+        self.api_key = settings.get("apiKey")
+        self.timeout = settings.get("timeout", 60)
+        self.max_retries = settings.get("maxRetries", 3)
+        self.backoff = settings.get("backoffSeconds", 1.0)
+
+        self.rate_limiter = TokenBucket(settings.get("requestsPerMinute", 60), settings.get("burst", 1))
+        self.cache = get_llm_cache(settings.get("cache", {}))
+
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._http_local = threading.local()
+
+    @classmethod
+    def shared(cls) -> "GPT":
+        """
+        Returns the process-wide client, configured by the `llm` settings.
+
+        :return: The shared GPT instance.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+
+        return cls._shared
+
+    def _get_session(self) -> "requests.Session":
+        """
+        Returns the HTTP session of the calling thread, so connections to
+        `baseUrl` are reused.
+
+        :return: curl_cffi Session
+        """
+        session = getattr(self._http_local, "session", None)
+
+        if session is None:
+            from curl_cffi import requests
+
+            session = requests.Session()
+            self._http_local.session = session
+
+        return session
+
+    def _get_client(self):
+        """
+        Returns the g4f client, created on first use.
+
+        g4f is slow to import and not needed with `baseUrl`, so it is only
+        loaded once a prompt goes through it.
+
+        :return: g4f Client
+        """
+        with self._client_lock:
+            if self._client is None:
+                from g4f.client import Client
+
+                self._client = Client()
+
+        return self._client
+
+    def _complete(self, prompt: str) -> str:
         """
-        self.client = Client()
-        self.base_model = "gpt-3.5-turbo"
-        self.provider = AiAsk
+        Sends a prompt to the model once, without cache or retries.
+
+        If `baseUrl` is set, the prompt is sent to that OpenAI-compatible
+        endpoint (e.g. a local stub), otherwise it goes through g4f.
 
-    def ask(self, prompt: str) -> str:
+        :param prompt: The prompt to send.
+
+        :return: The model's reply.
+        """
+        messages = [{"role": "user", "content": prompt}]
+
+        if self.base_url:
+            headers = {}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+
+            response = self._get_session().post(
+                self.base_url + "/chat/completions",
+                json={"model": self.base_model, "messages": messages},
+                headers=headers,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+
+            return response.json()["choices"][0]["message"]["content"]
+
+        return self._get_client().chat.completions.create(
+            model=self.base_model,
+            messages=messages,
+            timeout=self.timeout
+        ).choices[0].message.content
+
+    def ask(self, prompt: str, use_cache: bool = True) -> str:
         """
         Ask a question to GPT-3.5.
 
+        Requests are rate limited to `requestsPerMinute` across the process,
+        and failures are retried up to `maxRetries` times with jittered
+        exponential backoff.
+
         :param prompt: The prompt to ask GPT-3.5.
+        :param use_cache: If False, always asks the model, the reply still
+            replaces the cached one.
 
         :return: The response from GPT-3.5.
         """
-        response = self.client.chat.completions.create(
-            model=self.base_model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        ).choices[0].message.content
+        if self.cache and use_cache:
+            cached = self.cache.get(self.base_model, prompt)
+
+            if cached is not None:
+                metrics.incr("llm.cache_hits")
+                return cached
+
+            metrics.incr("llm.cache_misses")
+
+        attempt = 0
+
+        while True:
+            self.rate_limiter.acquire()
+
+            try:
+                with metrics.span("llm.call", model=self.base_model):
+                    response = self._complete(prompt)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    metrics.incr("llm.failures")
+                    raise
+
+                metrics.incr("llm.retries")
+                time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+                attempt += 1
+
+        if self.cache:
+            self.cache.set(self.base_model, prompt, response)
 
         return response
+
+    def forget(self, prompt: str) -> None:
+        """
+        Drops the cached reply to a prompt, so the next `ask` gets a new one.
+
+        :param prompt: The prompt.
+        """
+        if self.cache:
+            self.cache.delete(self.base_model, prompt)
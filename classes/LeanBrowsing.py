@@ -0,0 +1,278 @@
+from selenium.webdriver.chrome.options import Options
+from classes.Metrics import metrics
+from termcolor import colored
+from typing import Dict, List, Set
+
+import threading
+import json
+
+# Resource types lean mode can block
+RESOURCE_TYPES = ("image", "font", "media")
+
+# Chrome's own image setting, which blocks images by type rather than by URL
+IMAGES_DISABLED_ARGUMENT = "--blink-settings=imagesEnabled=false"
+
+# URL patterns blocked for fonts and media. Chrome matches the parts between
+# `*` anywhere in the URL, in order, so a pattern can't say "ends with": these
+# also block the rare URL with the extension in the middle, and assets served
+# without an extension still load. Only extensions unlikely to show up
+# inside a script or stylesheet URL are listed.
+RESOURCE_TYPE_PATTERNS = {
+    "font": ["*.woff", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.mp3", "*.m4a", "*.wav"]
+}
+
+# Analytics and ad hosts, none of them serves anything _parse_job reads
+DEFAULT_BLOCKED_URLS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*googlesyndication.com*",
+    "*googleadservices.com*",
+    "*doubleclick.net*",
+    "*facebook.net*",
+    "*connect.facebook.com*",
+    "*bat.bing.com*",
+    "*hotjar.com*",
+    "*segment.io*",
+    "*cdn.segment.com*",
+    "*newrelic.com*",
+    "*nr-data.net*",
+    "*optimizely.com*",
+    "*quantserve.com*",
+    "*scorecardresearch.com*",
+    "*adnxs.com*",
+    "*criteo.com*",
+    "*taboola.com*",
+    "*outbrain.com*"
+]
+
+# Why Chrome reports a request blocked by Network.setBlockedURLs
+_BLOCKED_REASON = "inspector"
+
+# Images the page asked for but Chrome didn't load, counted once per URL.
+# IMAGES_DISABLED_ARGUMENT stops them before any request is made, so they
+# never show up in the network log.
+_UNLOADED_IMAGES_SCRIPT = """
+return new Set(Array.from(document.images)
+    .filter(img => img.currentSrc || img.src)
+    .filter(img => !img.complete || img.naturalWidth === 0)
+    .map(img => img.currentSrc || img.src)).size;
+"""
+
+
+def _block_types(lean_settings: dict) -> List[str]:
+    # Helper function to read and check the resource types to block
+    block_types = lean_settings.get("blockTypes", list(RESOURCE_TYPES))
+
+    for resource_type in block_types:
+        if resource_type not in RESOURCE_TYPES:
+            raise ValueError(f"Unknown resource type to block: {resource_type}")
+
+    return block_types
+
+
+def browser_arguments(lean_settings: dict) -> List[str]:
+    """
+    Returns the Chrome arguments of lean mode. They only take effect on a
+    browser started with them, including the one started by the daemon.
+
+    :param lean_settings: The `chrome.lean` settings.
+    :return: The arguments
+    """
+    if not lean_settings.get("enabled") or "image" not in _block_types(lean_settings):
+        return []
+
+    return [IMAGES_DISABLED_ARGUMENT]
+
+
+def blocked_url_patterns(lean_settings: dict) -> List[str]:
+    """
+    Returns the URL patterns blocked in lean mode.
+
+    :param lean_settings: The `chrome.lean` settings.
+    :return: Patterns for Network.setBlockedURLs, `*` matches anything
+    """
+    patterns = []
+
+    for resource_type in _block_types(lean_settings):
+        patterns.extend(RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+
+    blocked_urls = lean_settings.get("blockedUrls")
+    patterns.extend(DEFAULT_BLOCKED_URLS if blocked_urls is None else blocked_urls)
+
+    return patterns
+
+
+def enable_network_log(options: Options) -> Options:
+    """
+    Asks chromedriver to keep the DevTools network events, read by
+    NetworkStats.collect to count blocked requests and loaded bytes.
+
+    :param options: Options the driver is started with.
+    :return: The options
+    """
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    return options
+
+
+def lean_options(options: Options, lean_settings: dict) -> Options:
+    """
+    Sets up the options of a new driver for lean mode: the network log, and
+    the arguments from `browser_arguments`.
+
+    :param options: Options the driver is started with.
+    :param lean_settings: The `chrome.lean` settings.
+    :return: The options
+    """
+    if not lean_settings.get("enabled"):
+        return options
+
+    for argument in browser_arguments(lean_settings):
+        options.add_argument(argument)
+
+    return enable_network_log(options)
+
+
+def enable_lean_mode(driver, lean_settings: dict) -> None:
+    """
+    Blocks font, media and tracker requests in the driver's tab through
+    the DevTools protocol, by URL. Images are blocked by `lean_options` or
+    the daemon's arguments. The DOM itself is left untouched.
+
+    Has to be called for every new driver, including ones attached to a
+    running browser.
+
+    :param driver: The WebDriver.
+    :param lean_settings: The `chrome.lean` settings.
+    """
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_url_patterns(lean_settings)})
+
+    if browser_arguments(lean_settings):
+        network_stats.count_blocked_images(driver)
+
+
+class NetworkStats:
+    def __init__(self) -> None:
+        """
+        Counts the requests blocked in lean mode and the bytes actually
+        loaded, per resource type, from chromedriver's performance log.
+        Images blocked by IMAGES_DISABLED_ARGUMENT are never requested, so
+        they are counted from the page's `<img>` elements instead.
+        """
+        self.enabled = False
+        self.blocked: Dict[str, int] = {}
+        self.loaded: Dict[str, int] = {}
+        self.loaded_bytes: Dict[str, int] = {}
+
+        # Types of the requests still loading, per driver session
+        self._types: Dict[str, Dict[str, str]] = {}
+
+        # Sessions of the drivers with images disabled
+        self._images_blocked: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def count_blocked_images(self, driver) -> None:
+        """
+        Counts the unloaded images of every page `collect` is called for
+        with this driver, as blocked "image" requests.
+
+        :param driver: A WebDriver whose browser has images disabled.
+        """
+        with self._lock:
+            self._images_blocked.add(driver.session_id)
+
+    def collect(self, driver) -> None:
+        """
+        Reads the network events logged since the last call for this driver.
+
+        :param driver: A WebDriver started with `enable_network_log`.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            # Drivers started without the network log have nothing to read
+            return
+
+        blocked_images = 0
+
+        if driver.session_id in self._images_blocked:
+            try:
+                blocked_images = int(driver.execute_script(_UNLOADED_IMAGES_SCRIPT) or 0)
+            except Exception:
+                pass
+
+        with self._lock:
+            if blocked_images:
+                self.blocked["image"] = self.blocked.get("image", 0) + blocked_images
+                metrics.incr("browser.requests_blocked", blocked_images, type="image")
+
+            types = self._types.setdefault(driver.session_id, {})
+
+            for entry in entries:
+                message = json.loads(entry["message"])["message"]
+                params = message.get("params", {})
+                method = message.get("method")
+
+                if method == "Network.requestWillBeSent":
+                    types[params["requestId"]] = params.get("type", "Other").lower()
+
+                elif method == "Network.loadingFinished":
+                    resource_type = types.pop(params["requestId"], "other")
+                    size = int(params.get("encodedDataLength", 0))
+
+                    self.loaded[resource_type] = self.loaded.get(resource_type, 0) + 1
+                    self.loaded_bytes[resource_type] = self.loaded_bytes.get(resource_type, 0) + size
+
+                    metrics.incr("browser.requests_loaded", type=resource_type)
+                    metrics.incr("browser.bytes_loaded", size, type=resource_type)
+
+                elif method == "Network.loadingFailed":
+                    resource_type = types.pop(params["requestId"], None) or \
+                        params.get("type", "Other").lower()
+
+                    if params.get("blockedReason") == _BLOCKED_REASON:
+                        self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+                        metrics.incr("browser.requests_blocked", type=resource_type)
+
+    def release(self, driver) -> None:
+        """
+        Forgets the requests a driver left loading, call it when the driver
+        is quit or replaced.
+
+        :param driver: The WebDriver.
+        """
+        with self._lock:
+            self._types.pop(getattr(driver, "session_id", None), None)
+            self._images_blocked.discard(getattr(driver, "session_id", None))
+
+    def reset(self) -> None:
+        """
+        Clears the counts.
+        """
+        with self._lock:
+            self.blocked, self.loaded, self.loaded_bytes, self._types = {}, {}, {}, {}
+
+    def print_report(self) -> None:
+        """
+        Prints the blocked requests and the loaded requests and bytes.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            blocked = ", ".join(f"{count} {resource_type}" for resource_type, count in sorted(self.blocked.items()))
+            loaded_bytes = sum(self.loaded_bytes.values())
+            loaded = sum(self.loaded.values())
+
+        print(colored(f"=> Lean Chrome: blocked {sum(self.blocked.values())} requests " \
+                      f"({blocked or 'none'}), loaded {loaded} requests, " \
+                      f"{loaded_bytes / 1024 / 1024:.2f} MB", "blue"))
+
+
+# Enabled by Indeed when `chrome.lean` is on
+network_stats = NetworkStats()
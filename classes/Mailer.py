@@ -0,0 +1,256 @@
+from email.message import EmailMessage
+from classes.Metrics import metrics
+from config import get_smtp_settings
+from termcolor import colored
+from typing import Callable, Iterable
+
+import mimetypes
+import threading
+import smtplib
+import queue
+import ssl
+import os
+
+_shared_mailer = None
+_shared_mailer_lock = threading.Lock()
+
+
+class Mailer:
+    def __init__(self, smtp_settings: dict = None, idle_timeout: float = 60) -> None:
+        """
+        Queued SMTP sender. A background worker delivers the queued messages
+        over one authenticated connection, kept open between messages.
+
+        :param smtp_settings: SMTP settings to use instead of the config.
+        :param idle_timeout: Seconds without messages after which the
+            connection is closed.
+        """
+        self.settings = get_smtp_settings() if smtp_settings is None else smtp_settings
+        self.idle_timeout = idle_timeout
+
+        self.queue = queue.Queue()
+        self.sent = 0
+        self.failed = 0
+
+        self._connection = None
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        """
+        Opens and authenticates a connection. Uses implicit TLS if `secure`
+        is set, otherwise upgrades with STARTTLS. A server not offering
+        STARTTLS is refused, so the password is never sent in plaintext,
+        unless `insecure` is set.
+
+        :return: The connection.
+        """
+        host = self.settings["host"]
+        port = self.settings.get("port", 587)
+        context = ssl.create_default_context()
+
+        if self.settings.get("secure"):
+            connection = smtplib.SMTP_SSL(host, port, context=context, timeout=30)
+        else:
+            connection = smtplib.SMTP(host, port, timeout=30)
+            connection.ehlo()
+
+            if connection.has_extn("starttls"):
+                connection.starttls(context=context)
+                connection.ehlo()
+            elif not self.settings.get("insecure"):
+                connection.close()
+                raise smtplib.SMTPNotSupportedError(f"{host} doesn't offer STARTTLS, " \
+                                                    "set smtp.insecure to send without encryption")
+
+        auth = self.settings.get("auth", {})
+        if auth.get("user"):
+            connection.login(auth["user"], auth["pass"])
+
+        return connection
+
+    def _get_connection(self) -> smtplib.SMTP:
+        """
+        Returns the open connection if it is still alive, otherwise a new one.
+
+        :return: The connection.
+        """
+        if self._connection is not None:
+            try:
+                if self._connection.noop()[0] == 250:
+                    return self._connection
+            except smtplib.SMTPException:
+                pass
+
+            self._disconnect()
+
+        self._connection = self._connect()
+
+        return self._connection
+
+    def _disconnect(self) -> None:
+        """
+        Closes the connection, if any.
+        """
+        if self._connection is None:
+            return
+
+        try:
+            self._connection.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+        self._connection = None
+
+    def _build_message(self, recipient: str, subject: str, body: str, attachments: Iterable[str]) -> EmailMessage:
+        """
+        Builds one MIME message with the body and every attachment.
+
+        :param recipient: Recipient address.
+        :param subject: Subject line.
+        :param body: Plain text body.
+        :param attachments: Paths of the files to attach.
+
+        :return: The message.
+        """
+        sender = self.settings.get("auth", {}).get("user") or self.settings.get("from", "")
+
+        message = EmailMessage()
+        message["From"] = f"{self.settings['sender_name']} <{sender}>" if self.settings.get("sender_name") else sender
+        message["To"] = recipient
+        message["Subject"] = subject
+        message.set_content(body)
+
+        for path in attachments:
+            content_type, _ = mimetypes.guess_type(path)
+            maintype, subtype = (content_type or "application/octet-stream").split("/", 1)
+
+            with open(path, "rb") as file:
+                message.add_attachment(file.read(), maintype=maintype, subtype=subtype, \
+                                       filename=os.path.basename(path))
+
+        return message
+
+    def _deliver(self, message: EmailMessage) -> None:
+        """
+        Sends a message, reconnecting once if the connection dropped.
+
+        :param message: The message.
+        """
+        try:
+            self._get_connection().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self._disconnect()
+            self._get_connection().send_message(message)
+
+    def _run(self) -> None:
+        """
+        Worker loop, delivers queued messages until it receives None.
+        """
+        while True:
+            try:
+                item = self.queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()
+                continue
+
+            if item is None:
+                self._disconnect()
+                self.queue.task_done()
+                return
+
+            recipient, subject, body, attachments, on_sent, on_failed = item
+
+            try:
+                with metrics.span("mail.send"):
+                    message = self._build_message(recipient, subject, body, attachments)
+                    self._deliver(message)
+            except Exception as e:
+                self.failed += 1
+                metrics.incr("mail.failed")
+                self._disconnect()
+                print(colored(f"=> Error Sending Email to {recipient}: {e}", "red"))
+
+                self._callback(on_failed, e)
+            else:
+                self.sent += 1
+                metrics.incr("mail.sent")
+                print(colored(f"=> Email Sent Successfully to {message['To']}!", "green"))
+
+                # The message is out, a failing callback must not count it as failed
+                self._callback(on_sent, message)
+            finally:
+                self.queue.task_done()
+
+    @staticmethod
+    def _callback(callback: Callable, argument) -> None:
+        # Helper function to run a send callback, only logging its errors so the worker keeps going
+        if callback is None:
+            return
+
+        try:
+            callback(argument)
+        except Exception as e:
+            metrics.incr("mail.callback_errors")
+            print(colored(f"=> Error in Email Callback: {e}", "red"))
+
+    def send(self, recipient: str, subject: str, body: str, attachments: Iterable[str] = (), \
+             on_sent: Callable[[EmailMessage], None] = None, on_failed: Callable[[Exception], None] = None) -> None:
+        """
+        Queues a message for delivery and returns right away.
+
+        :param recipient: Recipient address.
+        :param subject: Subject line.
+        :param body: Plain text body.
+        :param attachments: Paths of the files to attach.
+        :param on_sent: Called with the message once it was delivered.
+        :param on_failed: Called with the error if it couldn't be delivered.
+
+        :raises FileNotFoundError: If an attachment is missing, nothing is queued then.
+        """
+        attachments = list(attachments)
+
+        for path in attachments:
+            if not path or not os.path.isfile(path):
+                raise FileNotFoundError(f"Attachment not found: {path}")
+
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="jobber-mailer", daemon=True)
+                self._worker.start()
+
+        self.queue.put((recipient, subject, body, attachments, on_sent, on_failed))
+
+    def flush(self) -> None:
+        """
+        Blocks until every queued message was handled.
+        """
+        self.queue.join()
+
+    def close(self) -> None:
+        """
+        Delivers the queued messages, then stops the worker.
+        """
+        with self._lock:
+            worker = self._worker
+
+        if worker is None or not worker.is_alive():
+            return
+
+        self.queue.put(None)
+        worker.join()
+
+
+def get_mailer() -> Mailer:
+    """
+    Returns the process-wide mailer, configured by the `smtp` settings.
+
+    :return: The shared Mailer.
+    """
+    global _shared_mailer
+
+    with _shared_mailer_lock:
+        if _shared_mailer is None:
+            _shared_mailer = Mailer()
+
+    return _shared_mailer
@@ -0,0 +1,330 @@
+from collections import deque
+from termcolor import colored
+from typing import Deque, Dict, Tuple
+
+import threading
+import bisect
+import json
+import time
+import os
+
+# Upper bounds of the histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Spans kept for the next JSON lines export, older ones are dropped
+DEFAULT_MAX_SPANS = 10000
+
+
+def _series_key(name: str, labels: dict) -> Tuple[str, tuple]:
+    # Helper function to identify a metric by its name and labels
+    return name, tuple(sorted(labels.items()))
+
+
+def _prometheus_name(name: str) -> str:
+    # Helper function to turn a dotted metric name into a Prometheus one
+    return "jobber_" + "".join(char if char.isalnum() else "_" for char in name)
+
+
+def _prometheus_escape(value) -> str:
+    # Helper function to escape a label value, as the text format requires
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prometheus_labels(labels: tuple, **extra) -> str:
+    # Helper function to format the labels of a Prometheus sample
+    pairs = list(labels) + list(extra.items())
+
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{key}="{_prometheus_escape(value)}"' for key, value in pairs) + "}"
+
+
+class _NullSpan:
+    # Returned by Metrics.span while metrics are disabled, does nothing
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "labels", "started_at", "start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: dict) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "_Span":
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        duration = time.perf_counter() - self.start
+        self.metrics._end_span(self.name, self.labels, self.started_at, duration, exc)
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False, export_format: str = "jsonl", path: str = None, \
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """
+        Records spans, counters and histograms, and exports them as JSON lines
+        or as a Prometheus textfile.
+
+        While disabled, every method returns right away, so instrumented code
+        costs one attribute check.
+
+        :param enabled: Whether to record anything.
+        :param export_format: "jsonl" or "prometheus".
+        :param path: File to export to. Defaults to metrics.jsonl or metrics.prom.
+        :param buckets: Upper bounds of the histogram buckets.
+        """
+        self.enabled = False
+        self.configure({"enabled": enabled, "format": export_format, "path": path}, buckets)
+
+    def configure(self, metrics_settings: dict, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """
+        (Re)configures the metrics and clears what was recorded so far.
+
+        :param metrics_settings: The `metrics` settings.
+        :param buckets: Upper bounds of the histogram buckets.
+        """
+        self.format = metrics_settings.get("format") or "jsonl"
+
+        if self.format not in ("jsonl", "prometheus"):
+            raise ValueError(f"Unknown metrics format: {self.format}")
+
+        self.path = metrics_settings.get("path") or \
+            ("metrics.prom" if self.format == "prometheus" else "metrics.jsonl")
+        self.buckets = tuple(sorted(buckets))
+
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._histograms: Dict[Tuple[str, tuple], dict] = {}
+        self._spans: Deque[dict] = deque(maxlen=metrics_settings.get("maxSpans") or DEFAULT_MAX_SPANS)
+
+        self.enabled = bool(metrics_settings.get("enabled", False))
+
+    def span(self, name: str, **labels):
+        """
+        Times a block of code. The duration goes into the `<name>` histogram,
+        labelled with the outcome, and into the span log of JSON line exports.
+
+            with metrics.span("llm.call", model=model):
+                ...
+
+        :param name: Name of the span, e.g. "indeed.page_load".
+        :param labels: Labels of the span.
+        :return: Context manager
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+
+        return _Span(self, name, labels)
+
+    def _end_span(self, name: str, labels: dict, started_at: float, duration: float, error: Exception) -> None:
+        """
+        Records a finished span.
+
+        :param name: Name of the span.
+        :param labels: Labels of the span.
+        :param started_at: Wall clock time the span started at.
+        :param duration: Seconds the span took.
+        :param error: The exception raised in the span, if any.
+        """
+        self.observe(name, duration, status="error" if error is not None else "ok", **labels)
+
+        if self.format == "jsonl":
+            event = {"type": "span", "name": name, "labels": labels, \
+                     "started_at": round(started_at, 6), "duration": round(duration, 6)}
+
+            if error is not None:
+                event["error"] = f"{type(error).__name__}: {error}"
+
+            with self._lock:
+                dropped = len(self._spans) == self._spans.maxlen
+                self._spans.append(event)
+
+            if dropped:
+                self.incr("metrics.spans_dropped")
+
+    def incr(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Adds to a counter.
+
+        :param name: Name of the counter, e.g. "indeed.jobs_found".
+        :param value: Amount to add.
+        :param labels: Labels of the counter.
+        """
+        if not self.enabled:
+            return
+
+        key = _series_key(name, labels)
+
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """
+        Records a value in a histogram.
+
+        :param name: Name of the histogram, e.g. "wait".
+        :param value: The value, in seconds.
+        :param labels: Labels of the histogram.
+        """
+        if not self.enabled:
+            return
+
+        key = _series_key(name, labels)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            histogram = self._histograms.get(key)
+
+            if histogram is None:
+                histogram = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * (len(self.buckets) + 1)}
+                self._histograms[key] = histogram
+
+            histogram["count"] += 1
+            histogram["sum"] += value
+            histogram["max"] = max(histogram["max"], value)
+            histogram["buckets"][index] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Returns everything recorded so far.
+
+        :return: Dictionary with the "counters", "histograms" and "spans"
+        """
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "histograms": [
+                    {"name": name, "labels": dict(labels), "count": histogram["count"], \
+                     "sum": histogram["sum"], "max": histogram["max"], \
+                     "buckets": dict(zip([*map(str, self.buckets), "+Inf"], histogram["buckets"]))}
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                ],
+                "spans": list(self._spans)
+            }
+
+    def _write_jsonl(self, path: str) -> None:
+        """
+        Appends the spans, then one line per counter and histogram, to a file.
+
+        :param path: The file.
+        """
+        snapshot = self.snapshot()
+        exported_at = round(time.time(), 6)
+
+        with open(path, "a") as file:
+            for span in snapshot["spans"]:
+                file.write(json.dumps(span) + "\n")
+
+            for counter in snapshot["counters"]:
+                file.write(json.dumps({"type": "counter", "exported_at": exported_at, **counter}) + "\n")
+
+            for histogram in snapshot["histograms"]:
+                file.write(json.dumps({"type": "histogram", "exported_at": exported_at, **histogram}) + "\n")
+
+        with self._lock:
+            self._spans.clear()
+
+    def _write_prometheus(self, path: str) -> None:
+        """
+        Writes the counters and histograms in the Prometheus text format,
+        replacing the file at once so the textfile collector never reads
+        half of it.
+
+        :param path: The file.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+
+        lines = []
+        declared = set()
+
+        for (name, labels), value in counters:
+            metric = _prometheus_name(name) + "_total"
+
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+
+            lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            metric = _prometheus_name(name) + "_seconds"
+
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+
+            cumulative = 0
+
+            for bound, count in zip([*self.buckets, "+Inf"], histogram["buckets"]):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_prometheus_labels(labels, le=bound)} {cumulative}")
+
+            lines.append(f"{metric}_sum{_prometheus_labels(labels)} {histogram['sum']}")
+            lines.append(f"{metric}_count{_prometheus_labels(labels)} {histogram['count']}")
+
+        temp_path = path + ".tmp"
+
+        with open(temp_path, "w") as file:
+            file.write("\n".join(lines) + "\n")
+
+        os.replace(temp_path, path)
+
+    def export(self, path: str = None) -> None:
+        """
+        Exports the metrics in the configured format. JSON lines are appended
+        to the file, a Prometheus textfile is replaced.
+
+        :param path: File to export to instead of the configured one.
+        """
+        if not self.enabled:
+            return
+
+        path = path or self.path
+
+        if self.format == "prometheus":
+            self._write_prometheus(path)
+        else:
+            self._write_jsonl(path)
+
+        print(colored(f"=> Metrics exported to {path}", "blue"))
+
+    def print_report(self) -> None:
+        """
+        Prints the number of calls, total and slowest time of every span.
+        """
+        if not self.enabled:
+            return
+
+        totals = {}
+
+        with self._lock:
+            for (name, labels), histogram in self._histograms.items():
+                total = totals.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+                total["count"] += histogram["count"]
+                total["sum"] += histogram["sum"]
+                total["max"] = max(total["max"], histogram["max"])
+
+        for name, total in sorted(totals.items()):
+            print(colored(f"=> {name}: {total['count']} calls, {total['sum']:.2f}s total, " \
+                          f"{total['max'] * 1000:.0f} ms slowest", "blue"))
+
+
+# Disabled until main() configures it, so library and benchmark use costs nothing
+metrics = Metrics()
@@ -0,0 +1,168 @@
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+from classes.Metrics import metrics
+from config import get_pdf_settings
+from termcolor import colored
+
+import multiprocessing
+import threading
+import os
+
+# Stylesheet parsed once per process, reused for every letter
+_stylesheet = None
+
+_shared_renderer = None
+_shared_renderer_lock = threading.Lock()
+
+
+def _load_stylesheet(css_path: str) -> None:
+    """
+    Parses the stylesheet of the current process.
+
+    :param css_path: Path to the CSS file.
+    """
+    global _stylesheet
+
+    # WeasyPrint is slow to import, only load it in processes that render
+    from weasyprint import CSS
+
+    _stylesheet = CSS(filename=css_path)
+
+
+def _render(markdown_text: str, pdf_path: str, css_path: str) -> str:
+    """
+    Renders Markdown to a PDF file with the warm stylesheet.
+
+    :param markdown_text: The Markdown to render.
+    :param pdf_path: Where to write the PDF.
+    :param css_path: Path to the CSS file, parsed on first use.
+
+    :return: The PDF path.
+    """
+    from md2pdf.conf import MARKDOWN_BASE_EXTENSIONS
+    from weasyprint import HTML
+    from markdown import markdown
+
+    if _stylesheet is None:
+        _load_stylesheet(css_path)
+
+    raw_html = markdown(markdown_text, extensions=MARKDOWN_BASE_EXTENSIONS)
+    HTML(string=raw_html, base_url=os.getcwd()).write_pdf(pdf_path, stylesheets=[_stylesheet])
+
+    return pdf_path
+
+
+class PDFRenderer:
+    def __init__(self, css_path: str = "css/md2pdf.css", workers: int = None) -> None:
+        """
+        In-process Markdown to PDF renderer, producing the same output as the
+        md2pdf CLI without starting a new interpreter for every letter.
+
+        :param css_path: Path to the CSS file.
+        :param workers: Processes used by render_batch. Defaults to the CPU count.
+        """
+        self.css_path = css_path
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+
+    def render(self, markdown_text: str, pdf_path: str) -> str:
+        """
+        Renders one letter in the current process.
+
+        :param markdown_text: The Markdown to render.
+        :param pdf_path: Where to write the PDF.
+
+        :return: The PDF path.
+        """
+        with metrics.span("pdf.render"):
+            pdf_path = _render(markdown_text, pdf_path, self.css_path)
+
+        metrics.incr("pdf.letters_rendered")
+
+        return pdf_path
+
+    def _try_render(self, markdown_text: str, pdf_path: str) -> Optional[str]:
+        # Helper function to render one letter of a batch, a failure only loses that letter
+        try:
+            return self.render(markdown_text, pdf_path)
+        except Exception as e:
+            print(colored(f"=> Error Converting {pdf_path} to PDF! ({e})", "red"))
+            metrics.incr("pdf.render_failures")
+            return None
+
+    def render_batch(self, letters: Iterable[Tuple[str, str]]) -> List[Optional[str]]:
+        """
+        Renders many letters across a pool of processes. The pool and the
+        stylesheet each worker parsed stay warm between batches.
+
+        :param letters: (markdown_text, pdf_path) tuples, each with its own path.
+
+        :return: The PDF paths, in the order of the letters, None for the
+            letters that failed to render.
+        """
+        letters = list(letters)
+
+        if len(letters) <= 1 or self.workers <= 1:
+            return [self._try_render(markdown_text, pdf_path) for markdown_text, pdf_path in letters]
+
+        if self._pool is None:
+            # Forking would copy the pipeline's threads, locks and Chrome
+            # connections in whatever state they are in, spawn starts clean
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_stylesheet,
+                initargs=(self.css_path,)
+            )
+
+        with metrics.span("pdf.render_batch"):
+            futures = [
+                self._pool.submit(_render, markdown_text, pdf_path, self.css_path)
+                for markdown_text, pdf_path in letters
+            ]
+
+            pdf_paths = []
+
+            for future, (_, pdf_path) in zip(futures, letters):
+                try:
+                    pdf_paths.append(future.result())
+                except Exception as e:
+                    print(colored(f"=> Error Converting {pdf_path} to PDF! ({e})", "red"))
+                    metrics.incr("pdf.render_failures")
+                    pdf_paths.append(None)
+
+        # A crashed worker breaks the whole pool, the next batch starts a new one
+        if any(isinstance(future.exception(), BrokenProcessPool) for future in futures):
+            self.close()
+
+        metrics.incr("pdf.letters_rendered", sum(pdf_path is not None for pdf_path in pdf_paths))
+
+        return pdf_paths
+
+    def close(self) -> None:
+        """
+        Shuts the process pool down.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def get_pdf_renderer() -> PDFRenderer:
+    """
+    Returns the process-wide renderer, configured by the `pdf` settings.
+
+    :return: The shared PDFRenderer.
+    """
+    global _shared_renderer
+
+    with _shared_renderer_lock:
+        if _shared_renderer is None:
+            pdf_settings = get_pdf_settings()
+            _shared_renderer = PDFRenderer(
+                css_path=pdf_settings.get("css", "css/md2pdf.css"),
+                workers=pdf_settings.get("workers")
+            )
+
+    return _shared_renderer
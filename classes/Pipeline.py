@@ -0,0 +1,234 @@
+from typing import Any, Callable, Iterable, Iterator, List
+from classes.Metrics import metrics
+from termcolor import colored
+
+import threading
+import queue
+import time
+
+# Marks the end of the items on a queue
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable, workers: int = 1, \
+                 batch_size: int = None, batch_timeout: float = 0.5, flush: Callable = None) -> None:
+        """
+        One step of a pipeline.
+
+        :param name: Name of the stage in the report.
+        :param func: Called with one item and returns the item for the next
+            stage, or None to drop it. With a batch size, it is called with a
+            list of items and returns the list to pass on.
+        :param workers: Number of threads running the stage.
+        :param batch_size: Collect up to this many items per call.
+        :param batch_timeout: Seconds to wait for a batch to fill up.
+        :param flush: Called without arguments once every item went through
+            the stage, returns a list of items it held back for the next stage.
+        """
+        self.name = name
+        self.func = func
+        self.flush = flush
+        self.workers = max(1, int(workers))
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+
+        self.received = 0
+        self.passed = 0
+        self.failed = 0
+        self.busy = 0.0
+
+        self._running = self.workers
+        self._lock = threading.Lock()
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], queue_size: int = 32) -> None:
+        """
+        Runs stages concurrently, connected by bounded queues.
+
+        A full queue blocks the stage feeding it, so memory stays bounded and
+        throughput is set by the slowest stage instead of the sum of all.
+
+        :param stages: The stages, in order.
+        :param queue_size: Maximum number of items waiting in front of a stage.
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+        self.elapsed = 0.0
+
+    def _take(self, stage: Stage, inbox: queue.Queue) -> tuple:
+        """
+        Takes the next item, or batch of items, off a queue.
+
+        :param stage: The stage taking the items.
+        :param inbox: The stage's queue.
+        :return: (items, done), done is True once the queue is finished
+        """
+        item = inbox.get()
+
+        if item is _DONE:
+            return [], True
+
+        items = [item]
+
+        if not stage.batch_size:
+            return items, False
+
+        deadline = time.monotonic() + stage.batch_timeout
+
+        while len(items) < stage.batch_size:
+            try:
+                item = inbox.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+
+            if item is _DONE:
+                return items, True
+
+            items.append(item)
+
+        return items, False
+
+    def _work(self, stage: Stage, inbox: queue.Queue, outbox: queue.Queue, next_workers: int) -> None:
+        """
+        Worker loop of a stage.
+
+        :param stage: The stage.
+        :param inbox: Queue to take items from.
+        :param outbox: Queue to put results on.
+        :param next_workers: Number of workers of the next stage, each gets a _DONE.
+        """
+        done = False
+
+        while not done:
+            items, done = self._take(stage, inbox)
+
+            if not items:
+                continue
+
+            start = time.perf_counter()
+
+            try:
+                with metrics.span("pipeline.stage", stage=stage.name):
+                    results = stage.func(items) if stage.batch_size else [stage.func(items[0])]
+            except Exception as e:
+                results = []
+                metrics.incr("pipeline.failures", len(items), stage=stage.name)
+
+                with stage._lock:
+                    stage.failed += len(items)
+
+                print(colored(f"=> Error in Pipeline Stage {stage.name}: {e}", "red"))
+
+            results = [result for result in results or [] if result is not None]
+
+            with stage._lock:
+                stage.received += len(items)
+                stage.passed += len(results)
+                stage.busy += time.perf_counter() - start
+
+            for result in results:
+                outbox.put(result)
+
+        with stage._lock:
+            stage._running -= 1
+            last = stage._running == 0
+
+        if last and stage.flush:
+            try:
+                with metrics.span("pipeline.stage", stage=stage.name):
+                    results = [result for result in stage.flush() or [] if result is not None]
+            except Exception as e:
+                results = []
+                print(colored(f"=> Error in Pipeline Stage {stage.name}: {e}", "red"))
+
+            with stage._lock:
+                stage.passed += len(results)
+
+            for result in results:
+                outbox.put(result)
+
+        # The last worker out tells every worker of the next stage to stop
+        if last:
+            for _ in range(next_workers):
+                outbox.put(_DONE)
+
+    def _feed(self, source: Iterable, outbox: queue.Queue, workers: int) -> None:
+        """
+        Puts the source items on the first queue.
+
+        :param source: The items.
+        :param outbox: Queue of the first stage.
+        :param workers: Number of workers of the first stage.
+        """
+        try:
+            for item in source:
+                outbox.put(item)
+        except Exception as e:
+            print(colored(f"=> Error in Pipeline Source: {e}", "red"))
+        finally:
+            for _ in range(workers):
+                outbox.put(_DONE)
+
+    def run(self, source: Iterable) -> Iterator[Any]:
+        """
+        Runs the pipeline over the source items.
+
+        :param source: Items for the first stage. Iterated on its own thread,
+            blocking while the first queue is full.
+
+        :return: Iterator of the items coming out of the last stage
+        """
+        start = time.perf_counter()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages] + [queue.Queue()]
+
+        for stage in self.stages:
+            stage._running = stage.workers
+
+        threads = [threading.Thread(
+            target=self._feed,
+            args=(source, queues[0], self.stages[0].workers),
+            name="jobber-pipeline-source",
+            daemon=True
+        )]
+
+        for index, stage in enumerate(self.stages):
+            next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[index], queues[index + 1], next_workers),
+                    name=f"jobber-pipeline-{stage.name}-{worker}",
+                    daemon=True
+                ))
+
+        for thread in threads:
+            thread.start()
+
+        while True:
+            item = queues[-1].get()
+
+            if item is _DONE:
+                break
+
+            yield item
+
+        for thread in threads:
+            thread.join()
+
+        self.elapsed = time.perf_counter() - start
+
+    def print_report(self) -> None:
+        """
+        Prints the items, failures and busy time of every stage.
+        """
+        for stage in self.stages:
+            utilization = stage.busy / (stage.workers * self.elapsed) if self.elapsed else 0
+
+            print(colored(f"=> Stage {stage.name}: {stage.received} in, {stage.passed} out, " \
+                          f"{stage.failed} failed, {stage.busy:.2f}s busy over {stage.workers} " \
+                          f"worker{'s' if stage.workers > 1 else ''} ({utilization:.0%})", "blue"))
+
+        print(colored(f"=> Pipeline finished in {self.elapsed:.2f}s", "green"))
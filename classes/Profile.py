@@ -0,0 +1,109 @@
+from typing import Optional
+
+import json
+import os
+
+# Bump when the stored profile or its prompt context change shape
+PROFILE_VERSION = 1
+
+
+def _join(items) -> str:
+    # Joins a list or comma separated string, skipping empty items
+    if isinstance(items, str):
+        items = items.split(",")
+
+    return ", ".join(str(item).strip() for item in items if str(item).strip())
+
+
+def _describe_project(project: dict) -> str:
+    # Describes a project on one line
+    description = f"{project['name']} - {project['description']}"
+
+    if project.get("keywords"):
+        description += f" [{_join(project['keywords'])}]"
+
+    if project.get("project_url"):
+        description += f" ({project['project_url']})"
+
+    return description
+
+
+def compile_prompt_context(info: dict) -> str:
+    """
+    Builds the compact, plain text description of the applicant used in every
+    cover letter prompt.
+
+    :param info: The user information, as returned by `_get_information`.
+    :return: The prompt fragment
+    """
+    lines = [
+        f"Full Name: {info['full_name']}",
+        f"Email: {info['email']}",
+        f"Location: {_join([info['city'], info['country']])}",
+        f"Phone Number: {info['phone_number']}",
+    ]
+
+    if info.get("profiles"):
+        lines.append("Profiles: " + "; ".join(
+            f"{profile['network']}: {profile['url']}" for profile in info["profiles"]
+        ))
+
+    if info.get("skills"):
+        lines.append("Skills: " + "; ".join(
+            f"{_join(skill['name'])}: {_join(skill['keywords'])}" for skill in info["skills"]
+        ))
+
+    if info.get("educations"):
+        lines.append("Education: " + "; ".join(
+            f"{education['area']} at {education['institution']} (since {education['start_date']})"
+            for education in info["educations"]
+        ))
+
+    if info.get("projects"):
+        lines.append("Projects: " + "; ".join(_describe_project(project) for project in info["projects"]))
+
+    return "\n".join(lines)
+
+
+class Profile:
+    def __init__(self, data: dict, path: str = "profile.json", prompt_context: str = None) -> None:
+        """
+        Applicant profile, stored once and reused by every run.
+
+        :param data: The user information, as returned by `_get_information`.
+        :param path: JSON file the profile is stored in.
+        :param prompt_context: Precompiled prompt fragment, compiled from the data if not given.
+        """
+        self.data = data
+        self.path = path
+        self.prompt_context = prompt_context or compile_prompt_context(data)
+
+    @classmethod
+    def load(cls, path: str = "profile.json") -> Optional["Profile"]:
+        """
+        Loads a stored profile.
+
+        :param path: JSON file the profile is stored in.
+        :return: The profile, or None if there is none or it has an older version
+        """
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as file:
+            stored = json.load(file)
+
+        if stored.get("version") != PROFILE_VERSION:
+            return None
+
+        return cls(stored["data"], path=path, prompt_context=stored.get("prompt_context"))
+
+    def save(self) -> None:
+        """
+        Stores the profile and its prompt context.
+        """
+        with open(self.path, "w") as file:
+            json.dump({
+                "version": PROFILE_VERSION,
+                "data": self.data,
+                "prompt_context": self.prompt_context
+            }, file, indent=2)
@@ -1,40 +1,113 @@
 from selenium.webdriver.chrome.webdriver import WebDriver
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support import expected_conditions
 from selenium.webdriver.common.by import By
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from classes.EmailCrawler import EmailCrawler, extract_emails, extract_links, rank_emails
+from classes.Waits import wait_for, element_present, network_idle
+from classes.Duplicates import DuplicateIndex
+from classes.Metrics import metrics
+from classes.DriverPool import DriverPool, get_chromedriver_path
+from classes.BrowserDaemon import BrowserDaemon
+from classes.LeanBrowsing import enable_lean_mode, lean_options, network_stats
 from classes.Database import Database
 from helpers import _send_email
 from termcolor import colored
-from typing import List
-from uuid import uuid4
-from config import *
+from typing import Iterator, List, Tuple
+from urllib.parse import urlparse, parse_qs, parse_qsl, urlencode
+from curl_cffi import requests
+from lxml import html as lxml_html
+from config import get_indeed_settings, get_chrome_config, get_dedup_settings
 
 import markdownify
+import threading
+import hashlib
 import time
-import re
 
+_http_local = threading.local()
 
-def _construct_url(job_query, place_query) -> str:
+# Number of parsed jobs written to the database per transaction
+DB_BATCH_SIZE = 50
+
+
+def _construct_url(job_query, place_query, start: int = 0, base_url: str = "https://www.indeed.com") -> str:
     """
     Creates the URL for the Indeed Search.
 
     :param job_query:
     :param place_query:
+    :param start: Offset of the first result, Indeed pages by 10.
+    :param base_url: Indeed site to search, e.g. https://uk.indeed.com.
     :return: The URL for the Indeed Search
     """
-    base_url = "https://www.indeed.com/jobs?q={}&l={}"
+    url = base_url.rstrip("/") + "/jobs?q={}&l={}".format(job_query, place_query)
 
-    url = base_url.format(job_query, place_query)
+    if start:
+        url += f"&start={start}"
 
     return url
 
 
-def _parse_job(url, driver) -> dict:
+def _extract_job_key(url: str) -> str:
+    """
+    Extracts Indeed's job key from a job URL.
+
+    :param url: Job URL, e.g. https://www.indeed.com/rc/clk?jk=0123456789abcdef
+    :return: The job key, or None if the URL doesn't carry one
+    """
+    if not url:
+        return None
+
+    query = parse_qs(urlparse(url).query)
+
+    for param in ("jk", "vjk"):
+        if query.get(param):
+            return query[param][0]
+
+    return None
+
+
+# Query parameters that change between visits of the same job URL
+TRACKING_PARAMS = ("tk", "from", "advn", "adid", "ad", "sjdu", "xkcb", "xpse", "xfps", "bb", "camk", "pub")
+
+
+def _fallback_job_key(url: str) -> str:
+    """
+    Derives a stable key for a listing without a job key, from its URL
+    without the fragment and tracking parameters.
+
+    :param url: Job URL.
+    :return: The key, or None without a URL
+    """
+    if not url:
+        return None
+
+    parsed = urlparse(url)
+    query = sorted((key, value) for key, value in parse_qsl(parsed.query) if key.lower() not in TRACKING_PARAMS)
+    normalized = parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(), \
+                                 query=urlencode(query), fragment="").geturl()
+
+    return "url-" + hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def _page_ready(element_id: str):
+    """
+    Condition met once the element is present or, on pages without it, once
+    the network went idle.
+
+    :param element_id: ID of the element the page is read for.
+    :return: The condition
+    """
+    return expected_conditions.any_of(element_present(By.ID, element_id), network_idle())
+
+
+def _parse_job(url, driver, wait_timeout: float = 10) -> dict:
     """
     Parses a job page and returns an entire job dictionary.
 
     :param url:
+    :param wait_timeout: Seconds to wait for the job description.
     :return: job dictionary
     """
     job = {}
@@ -42,7 +115,12 @@ def _parse_job(url, driver) -> dict:
     print(colored(f"=> Parsing Job: {url}", "blue"))
 
     # Open
-    driver.get(url)
+    with metrics.span("indeed.page_load", page="job", method="chrome"):
+        driver.get(url)
+        wait_for(driver, _page_ready("jobDescriptionText"), wait_timeout, "indeed.parse_job")
+
+    network_stats.collect(driver)
+
     try:
         job["salary"] = driver.find_element(By.ID, "salaryInfoAndJobType") \
             .find_element(By.TAG_NAME, "span").text or "N/A"
@@ -82,179 +160,581 @@ def _parse_job(url, driver) -> dict:
     return job
 
 
+def _first_text(element, xpath: str) -> str:
+    """
+    Returns the text of the first element matching an XPath, if any.
+
+    :param element: lxml element to search from.
+    :param xpath: Relative XPath expression.
+    :return: Stripped text content, or None
+    """
+    matches = element.xpath(xpath)
+
+    return matches[0].text_content().strip() if matches else None
+
+
+def _extract_listings(page_html: str, base_url: str) -> Tuple[List[dict], bool]:
+    """
+    Extracts the job listings from the HTML of a search results page.
+
+    :param page_html: HTML of the results page.
+    :param base_url: URL of the page, used to resolve relative links.
+    :return: The listings, and whether there is a next page
+    """
+    tree = lxml_html.fromstring(page_html)
+    tree.make_links_absolute(base_url)
+
+    listings = []
+
+    for card in tree.xpath('//*[@id="mosaic-jobResults"]//li'):
+        anchors = card.xpath('.//h2//a[contains(concat(" ", normalize-space(@class), " "), " jcs-JobTitle ")]')
+        if not anchors:
+            continue
+
+        anchor = anchors[0]
+        job_url = anchor.get("href")
+        titles = anchor.xpath(".//span[@title]")
+
+        job_key = anchor.get("data-jk") or _extract_job_key(job_url) or _fallback_job_key(job_url)
+
+        if not job_key:
+            print(colored("=> Skipping a Listing without a Job Key or URL.", "yellow"))
+            continue
+
+        listings.append({
+            "job_key": job_key,
+            "url": job_url,
+            "title": titles[0].get("title") if titles else anchor.text_content().strip(),
+            "company": _first_text(card, './/*[@data-testid="company-name"]'),
+            "location": _first_text(card, './/*[@data-testid="text-location"]')
+        })
+
+    has_next_page = bool(tree.xpath('//a[@data-testid="pagination-page-next"]'))
+
+    return listings, has_next_page
+
+
+def _get_http_session() -> requests.Session:
+    """
+    Returns the HTTP session of the calling thread, so connections are
+    reused across job pages.
+
+    :return: curl_cffi Session impersonating Chrome
+    """
+    session = getattr(_http_local, "session", None)
+
+    if session is None:
+        session = requests.Session(impersonate="chrome")
+        _http_local.session = session
+
+    return session
+
+
+def _extract_job(page_html: str) -> dict:
+    """
+    Extracts the job fields from the HTML of a job page, without a browser.
+
+    :param page_html: HTML of the job page.
+    :return: job dictionary, or None if the job description is missing
+    """
+    tree = lxml_html.fromstring(page_html)
+
+    description_divs = tree.xpath('//*[@id="jobDescriptionText"]')
+    if not description_divs:
+        return None
+
+    job = {}
+
+    salary_spans = tree.xpath('//*[@id="salaryInfoAndJobType"]//span')
+    job["salary"] = (salary_spans[0].text_content().strip() if salary_spans else "") or "N/A"
+
+    job["benefits"] = [
+        benefit.text_content().strip() for benefit in
+        tree.xpath('//*[@id="benefits"]//li')
+    ]
+
+    description_div = description_divs[0]
+    description_html = (description_div.text or "") + "".join(
+        lxml_html.tostring(child, encoding="unicode") for child in description_div
+    )
+    job["job_description_markdown"] = markdownify.markdownify(description_html) \
+        if description_html.strip() else "N/A"
+
+    for button in tree.xpath("//button"):
+        if "apply" in button.text_content().lower():
+            job["apply_button"] = button.get("href")
+            break
+
+    return job
+
+
+def _fetch_page(url: str) -> str:
+    """
+    Fetches a page over plain HTTP, without rendering it in Chrome.
+
+    :param url: URL of the page.
+    :return: The HTML, or None if the page could not be fetched
+    """
+    try:
+        response = _get_http_session().get(url, timeout=10)
+    except Exception:
+        return None
+
+    if response.status_code != 200:
+        return None
+
+    return response.text
+
+
+def _parse_job_fast(url: str) -> dict:
+    """
+    Parses a job page over plain HTTP, without rendering it in Chrome.
+
+    :param url: URL of the job page.
+    :return: job dictionary, or None if the page could not be parsed
+    """
+    with metrics.span("indeed.page_load", page="job", method="http"):
+        page_html = _fetch_page(url)
+
+    if page_html is None:
+        return None
+
+    with metrics.span("indeed.extract", page="job"):
+        return _extract_job(page_html)
+
+
 class Indeed:
-    def __init__(self, db: Database = None, job_query: str = "", place_query: str = ""):
+    def __init__(self, db: Database = None, job_query: str = "", place_query: str = "", driver=None):
         """
         Initializes the Indeed Class.
+
+        :param driver: A started driver to search with instead of Chrome, e.g.
+            one serving recorded pages in benchmarks.
         """
         self.indeed_conf = get_indeed_settings()
         self.chrome_conf = get_chrome_config()
         self.db = db
         self.jobs = []
+        self.crawler = EmailCrawler(db=db)
+        self.wait_timeout = self.indeed_conf.get("waitTimeout", 10)
+        # The search driver is shared by the pipeline stages
+        self.driver_lock = threading.RLock()
+
+        dedup_settings = get_dedup_settings()
+        self.duplicates = DuplicateIndex(db, threshold=dedup_settings.get("threshold", 0.8)) \
+            if db and dedup_settings.get("enabled", True) else None
+
+        daemon_settings = self.chrome_conf.get("daemon", {})
+        self.daemon = BrowserDaemon(self.chrome_conf) if daemon_settings.get("enabled") and driver is None else None
+        self.health_check_interval = daemon_settings.get("healthCheckInterval", 30)
+        self._checked_at = time.monotonic()
+
+        self.lean_settings = self.chrome_conf.get("lean", {})
+        network_stats.enabled = bool(self.lean_settings.get("enabled"))
 
         # Initialize chrome options
-        self.chrome_options = Options()
+        self.chrome_options = self._new_options()
+
+        if driver is not None:
+            self.driver = driver
+        elif self.daemon:
+            # Attach to the warm browser, starting it on the first run
+            self.driver = self.daemon.attach(self.chrome_options)
+        else:
+            if self.chrome_conf["headless"]:
+                self.chrome_options.add_argument("--headless")
+
+            # Set user data dir
+            self.chrome_options.add_argument(f"--user-data-dir={self.chrome_conf['userDataDir']}")
+            self.chrome_options.add_argument(f"--profile-directory={self.chrome_conf['profileName']}")
+
+            # Initialize driver
+            with metrics.span("browser.start"):
+                self.driver = WebDriver(options=self.chrome_options, \
+                                        service=Service(get_chromedriver_path()))
+
+        if self.lean_settings.get("enabled"):
+            enable_lean_mode(self.driver, self.lean_settings)
+
+        self.job_query = job_query or self.indeed_conf["jobQuery"]
+        self.place_query = place_query or self.indeed_conf["placeQuery"]
+
+        self.base_url = self.indeed_conf.get("baseUrl", "https://www.indeed.com")
+
+        url = _construct_url(self.job_query, self.place_query, base_url=self.base_url)
 
-        if self.chrome_conf["headless"]:
-            self.chrome_options.add_argument("--headless")
+        with metrics.span("indeed.page_load", page="results", method="chrome"):
+            self.driver.get(url)
+            wait_for(self.driver, _page_ready("mosaic-jobResults"), self.wait_timeout, "indeed.init")
 
-        # Set user data dir
-        self.chrome_options.add_argument(f"--user-data-dir={self.chrome_conf['userDataDir']}")
-        self.chrome_options.add_argument(f"--profile-directory={self.chrome_conf['profileName']}")
+        network_stats.collect(self.driver)
 
-        # Initialize driver
-        self.driver = WebDriver(options=self.chrome_options, \
-                                service=Service(ChromeDriverManager().install()))
+    def _new_options(self) -> Options:
+        """
+        Returns empty Chrome options, set up for lean mode if it is on.
+
+        :return: The options.
+        """
+        return lean_options(Options(), self.lean_settings)
+
+    def _ensure_driver(self) -> WebDriver:
+        """
+        Returns the search driver. In daemon mode, checks every
+        `healthCheckInterval` seconds that the browser still answers, and
+        attaches to a restarted one if it doesn't. Call with `driver_lock` held.
+
+        :return: The search driver.
+        """
+        if self.daemon and time.monotonic() - self._checked_at >= self.health_check_interval:
+            self._checked_at = time.monotonic()
 
-        url = _construct_url(job_query or self.indeed_conf["jobQuery"], \
-                             place_query or self.indeed_conf["placeQuery"])
+            if not self.daemon.is_healthy():
+                network_stats.release(self.driver)
+                self.driver = self.daemon.attach(self._new_options())
 
-        self.driver.get(url)
+                if self.lean_settings.get("enabled"):
+                    enable_lean_mode(self.driver, self.lean_settings)
 
-        time.sleep(3)
+        return self.driver
 
-    def search(self, advanced: bool = False) -> List[dict]:
+    def search(self, advanced: bool = False, incremental: bool = None) -> List[dict]:
         """
         Returns a list of available jobs.
 
         :param advanced: If True, will parse the job page for more information.
+        :param incremental: If True, only parses jobs that are new or were last
+            parsed more than `staleAfterHours` ago. Defaults to the config.
 
         :return: List of available jobs, in dictionaries.
         """
-        driver = self.driver
-
-        mosaic_job_results = driver.find_element(By.ID, "mosaic-jobResults")
-
-        jobs_list = mosaic_job_results.find_element(By.XPATH, \
-            "/html/body/main/div/div[2]/div/div[5]/div/div[1]/div[5]/div/ul")
-
-        if jobs_list:
-            # Get all list items.
-            jobs = jobs_list.find_elements(By.TAG_NAME, "li")
-            cmpny_index = 0
-
-            for job in jobs:
-                try:
-                    job_h2 = job.find_element(By.TAG_NAME, "h2")
-                    job_url = job_h2.find_element(By.CLASS_NAME, "jcs-JobTitle") \
-                        .get_attribute("href")
-                    job_title = job_h2.find_element(By.TAG_NAME, "span") \
-                        .get_attribute("title")
-                    spans = driver.find_elements(By.CLASS_NAME, "company_location")
-                    company_name = spans[cmpny_index].text if len(spans) > 0 else None
-                    company_location = spans[cmpny_index + 1].text if len(spans) > 1 else None
-                    print(colored(f"=> Found Job Location: {company_location}", "green"))
-
-                    job_id = str(uuid4())
-
-                    if self.db:
-                        self.db.insert_job({
-                            "id": job_id,
-                            "url": job_url,
-                            "title": job_title,
-                            "company": company_name,
-                            "location": company_location
-                        })
-
-                    cmpny_index += 2
-                except:
-                    continue
-
-                self.jobs.append({
-                    "id": job_id,
-                    "url": job_url,
-                    "title": job_title,
-                    "company": company_name,
-                    "location": company_location
-                })
-
-            if advanced:
-                for job in self.jobs:
-                    parsed = _parse_job(job["url"], driver)
-
-                    job["salary"] = parsed["salary"]
-                    job["benefits"] = parsed["benefits"]
-                    job["job_description_markdown"] = parsed["job_description_markdown"]
-                    job["apply_button"] = parsed["apply_button"]
-
-                    if self.db:
-                        self.db.update_job({
-                            "id": job["id"],
-                            "title": job["title"],
-                            "location": job["location"],
-                            "salary": job["salary"],
-                            "benefits": job["benefits"],
-                            "job_description_markdown": job["job_description_markdown"],
-                            "apply_button": job["apply_button"],
-                            "url": job["url"]
-                        })
+        self.jobs.extend(self.iter_jobs(advanced=advanced, incremental=incremental))
 
-        else:
+        if not self.jobs:
             print(colored("=> No Jobs List found.", "red"))
 
         return self.jobs
 
+    def iter_listings(self, max_pages: int = None, max_jobs: int = None) -> Iterator[List[dict]]:
+        """
+        Follows the search result pages and yields the listings of every
+        page, stored in the database. Known jobs come with their ID and the
+        time they were last parsed.
+
+        :param max_pages: Maximum number of result pages to read. Defaults to
+            `maxPages` in the config, or 1.
+        :param max_jobs: Maximum number of listings to yield. Defaults to
+            `maxJobs` in the config, or no limit.
+
+        :return: Iterator of lists of job dictionaries, one per page.
+        """
+        max_pages = max_pages or self.indeed_conf.get("maxPages", 1)
+        max_jobs = max_jobs or self.indeed_conf.get("maxJobs")
+
+        yielded = 0
+
+        for page in range(max_pages):
+            url = _construct_url(self.job_query, self.place_query, start=page * 10, base_url=self.base_url)
+
+            with self.driver_lock:
+                driver = self._ensure_driver()
+
+                if driver.current_url != url:
+                    with metrics.span("indeed.page_load", page="results", method="chrome"):
+                        driver.get(url)
+                        wait_for(driver, _page_ready("mosaic-jobResults"), self.wait_timeout, "indeed.results_page")
+
+                    network_stats.collect(driver)
+
+                with metrics.span("indeed.extract", page="results"):
+                    listings, has_next_page = _extract_listings(driver.page_source, url)
+
+            if max_jobs:
+                listings = listings[:max_jobs - yielded]
+
+            if not listings:
+                break
+
+            print(colored(f"=> Found {len(listings)} Jobs on Page {page + 1}", "green"))
+            metrics.incr("indeed.jobs_found", len(listings))
+
+            now = time.time()
+
+            for job in listings:
+                job["discovered_at"] = now
+
+            if self.db:
+                self.db.upsert_jobs(listings)
+                known_jobs = self.db.lookup_jobs(job["job_key"] for job in listings)
+                self.db.start_applications(known["id"] for known in known_jobs.values())
+
+                for job in listings:
+                    if job["job_key"] in known_jobs:
+                        job["id"] = known_jobs[job["job_key"]]["id"]
+                        job["parsed_at"] = known_jobs[job["job_key"]]["parsed_at"]
+
+            yielded += len(listings)
+            yield listings
+
+            if not has_next_page or (max_jobs and yielded >= max_jobs):
+                break
+
+    def needs_parse(self, job: dict, incremental: bool = None) -> bool:
+        """
+        Whether the detail page of a listing should be parsed.
+
+        :param job: Job dictionary, as yielded by iter_listings.
+        :param incremental: If True, only jobs that are new or were last parsed
+            more than `staleAfterHours` ago need parsing. Defaults to the config.
+
+        :return: True if the job should be parsed.
+        """
+        if incremental is None:
+            incremental = self.indeed_conf.get("incremental", True)
+
+        if not incremental:
+            return True
+
+        stale_before = time.time() - self.indeed_conf.get("staleAfterHours", 168) * 3600
+
+        return (job.get("parsed_at") or 0) < stale_before
+
+    def update_parsed_job(self, job: dict, parsed: dict) -> dict:
+        """
+        Copies the fields of a parsed detail page into the job and files it
+        into its near-duplicate cluster. Doesn't write to the database.
+
+        :param job: Job dictionary.
+        :param parsed: Result of parsing the detail page.
+
+        :return: The job.
+        """
+        job["salary"] = parsed["salary"]
+        job["benefits"] = parsed["benefits"]
+        job["job_description_markdown"] = parsed["job_description_markdown"]
+        job["apply_button"] = parsed.get("apply_button")
+        job["parsed_at"] = time.time()
+
+        if self.duplicates and job.get("id") and job["job_description_markdown"] != "N/A":
+            job["cluster_id"], similarity = self.duplicates.add(job["id"], job["job_description_markdown"])
+
+            if job["cluster_id"] != job["id"]:
+                metrics.incr("indeed.duplicates")
+                print(colored(f"=> Job {job['id']} duplicates Job {job['cluster_id']} ({similarity:.0%})", "blue"))
+
+        return job
+
+    def iter_jobs(self, max_pages: int = None, max_jobs: int = None, \
+                  advanced: bool = True, incremental: bool = None) -> Iterator[dict]:
+        """
+        Follows the search result pages and yields every job as soon as it
+        is ready. Only one results page is held in memory at a time.
+
+        :param max_pages: Maximum number of result pages to read. Defaults to
+            `maxPages` in the config, or 1.
+        :param max_jobs: Maximum number of jobs to yield. Defaults to `maxJobs`
+            in the config, or no limit.
+        :param advanced: If True, will parse the job page for more information.
+        :param incremental: If True, only parses jobs that are new or were last
+            parsed more than `staleAfterHours` ago; the others are yielded with
+            their listing fields only. Defaults to the config.
+
+        :return: Iterator of job dictionaries.
+        """
+        parallelism = self.indeed_conf.get("parallelism", 1)
+
+        # One pool for the whole search, its Chrome workers stay warm between pages
+        pool = DriverPool(size=parallelism, lean_settings=self.lean_settings) \
+            if advanced and parallelism > 1 else None
+
+        try:
+            yield from self._iter_parsed_jobs(max_pages, max_jobs, advanced, incremental, parallelism, pool)
+        finally:
+            if pool is not None:
+                pool.close()
+
+    def _iter_parsed_jobs(self, max_pages: int, max_jobs: int, advanced: bool, incremental: bool, \
+                          parallelism: int, pool: DriverPool) -> Iterator[dict]:
+        # Helper function to run iter_jobs on a driver pool shared by every page
+        for listings in self.iter_listings(max_pages, max_jobs):
+            to_parse = [job for job in listings if self.needs_parse(job, incremental)] if advanced else []
+
+            if advanced and len(to_parse) < len(listings):
+                print(colored(f"=> Skipping {len(listings) - len(to_parse)} Jobs parsed recently.", "blue"))
+
+            parse_keys = {job["job_key"] for job in to_parse}
+
+            for job in listings:
+                if job["job_key"] not in parse_keys:
+                    yield job
+
+            start = time.perf_counter()
+            parsed_jobs = []
+
+            for job, parsed in self._parse_jobs(to_parse, parallelism, pool):
+                if parsed is None:
+                    yield job
+                    continue
+
+                parsed_jobs.append(self.update_parsed_job(job, parsed))
+
+                if self.db and len(parsed_jobs) >= DB_BATCH_SIZE:
+                    self.db.upsert_jobs(parsed_jobs)
+                    parsed_jobs = []
+
+                yield job
+
+            if self.db:
+                self.db.upsert_jobs(parsed_jobs)
+
+            if to_parse:
+                elapsed = time.perf_counter() - start
+                print(colored(f"=> Parsed {len(to_parse)} Jobs in {elapsed:.2f}s " \
+                              f"({parallelism} worker{'s' if parallelism > 1 else ''})", "green"))
+
+    def parse_job(self, job: dict, pool: DriverPool = None) -> dict:
+        """
+        Parses the detail page of one job, over HTTP first and in Chrome if
+        that fails. Safe to call from several threads.
+
+        :param job: Job dictionary with a "url".
+        :param pool: Pool whose driver for the calling thread is used for
+            Chrome. Without one, the search driver is used, one job at a time.
+
+        :return: The parsed fields, or None on failure.
+        """
+        if self.indeed_conf.get("fastParse", True):
+            parsed = _parse_job_fast(job["url"])
+
+            if parsed is not None:
+                print(colored(f"=> Parsed Job over HTTP: {job['url']}", "blue"))
+                return parsed
+
+            metrics.incr("indeed.fast_parse_fallbacks")
+
+        try:
+            if pool is not None:
+                return _parse_job(job["url"], pool.get_driver(), self.wait_timeout)
+
+            with self.driver_lock:
+                return _parse_job(job["url"], self._ensure_driver(), self.wait_timeout)
+        except Exception as e:
+            print(colored(f"=> Error Parsing Job: {job['url']} ({e})", "red"))
+            metrics.incr("indeed.parse_failures")
+            return None
+
+    def _parse_jobs(self, jobs: List[dict], parallelism: int = 1, pool: DriverPool = None):
+        """
+        Parses the detail page of every job with `parse_job`: over HTTP
+        first, in Chrome for the pages the fast path can't read. With a
+        parallelism of 1, Chrome pages are opened one after another on the
+        search driver, otherwise on a pool of headless workers.
+
+        :param jobs: Jobs to parse.
+        :param parallelism: Number of Chrome workers to use.
+        :param pool: Pool of Chrome workers to parse with. Without one, a
+            pool is started for these jobs only.
+
+        :return: Iterator of (job, parsed) tuples, parsed is None on failure.
+        """
+        if parallelism > 1 and pool is None:
+            with DriverPool(size=parallelism, lean_settings=self.lean_settings) as pool:
+                yield from self._parse_jobs(jobs, parallelism, pool)
+            return
+
+        if pool is not None:
+            yield from pool.run(lambda job: self.parse_job(job, pool), jobs)
+            return
+
+        # HTTP fetches overlap, Chrome pages take turns on the search driver
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {executor.submit(self.parse_job, job): job for job in jobs}
+
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def _on_sent(self, job_id: int, recipient: str) -> None:
+        # Helper function to record a delivered application email, called by the mailer
+        self.db.set_send_status(job_id, recipient, "sent")
+        self.db.set_application_state(job_id, "sent")
+
+    def _on_failed(self, job_id: int, recipient: str, error: Exception) -> None:
+        # Helper function to record a failed application email, called by the mailer
+        self.db.set_send_status(job_id, recipient, "failed", str(error))
+
+        # One delivered email is enough for the application to count as sent
+        if (self.db.get_application(job_id) or {}).get("state") != "sent":
+            self.db.set_application_state(job_id, "failed", error=str(error))
+
     def apply(self, job_id: str, cover_letter: str, resume: str) -> bool:
         """
         Applies to a job.
 
+        Looks for an email on the job page first, then crawls the company
+        websites it links to. The job page is fetched over HTTP when
+        `fastParse` is on, and opened in Chrome otherwise or if that fails.
+
         :param job_id: The job ID to apply to.
         :return: True if successful, False if not.
         """
         job = self.db.get_job(job_id)
 
-        if job:
-            driver = self.driver
-
-            driver.get(job["url"])
+        if not job:
+            return False
 
-            time.sleep(3)
+        if (self.db.get_application(job["id"]) or {}).get("state") == "sent":
+            print(colored(f"\t=> Already applied to Job {job_id}.", "blue"))
+            return True
 
-            # Find all anchors
-            anchors = driver.find_elements(By.TAG_NAME, "a")
+        page_html = _fetch_page(job["url"]) if self.indeed_conf.get("fastParse", True) else None
+        page_url = job["url"]
 
-            # Find emails
-            emails = []
+        if page_html is None or _extract_job(page_html) is None:
+            metrics.incr("indeed.fast_parse_fallbacks")
 
-            for anchor in anchors:
-                if re.match(regexp, anchor.text):
-                    emails.append(anchor.text)
+            with self.driver_lock, metrics.span("indeed.page_load", page="apply", method="chrome"):
+                driver = self._ensure_driver()
+                driver.get(job["url"])
+                wait_for(driver, _page_ready("jobDescriptionText"), self.wait_timeout, "indeed.apply")
+                network_stats.collect(driver)
 
-            if len(emails) > 0:
-                print(colored(f"\t=> Found Email: {emails[0]}", "green"))
+                page_html = driver.page_source
+                page_url = driver.current_url
 
-                return True
-            else:
-                # Try and find all URLs
-                urls = []
+        # The rest of the page is Indeed's, its addresses are never the employer's
+        emails = rank_emails(extract_emails(page_html, within='//*[@id="jobDescriptionText"]'))
 
-                for anchor in anchors:
-                    if anchor.get_attribute("href"):
-                        urls.append(anchor.get_attribute("href"))
-
-                if len(urls) > 0:
-                    urls = list(set(urls))
-                    # Go to each URL and try to find an email
-                    for url in urls:
-                        driver.get(url)
+        if not emails:
+            urls = extract_links(page_html, page_url)
 
-                        time.sleep(3)
+            if job.get("apply_button"):
+                urls.insert(0, job["apply_button"])
 
-                        anchors = driver.find_elements(By.TAG_NAME, "a")
-                        regexp = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+            with metrics.span("crawler.find_emails"):
+                emails = rank_emails(self.crawler.find_emails(urls))
 
-                        for anchor in anchors:
-                            if re.match(regexp, anchor.text):
-                                emails.append(anchor.text)
+        if not emails:
+            print(colored(f"\t=> No Email found for Job {job_id}.", "red"))
+            metrics.incr("indeed.no_email")
+            self.db.set_application_state(job["id"], "failed", error="No email found")
+            return False
 
-                        if len(emails) > 0:
-                            print(colored(f"\t=> Found Email: {emails[0]}", "green"))
+        print(colored(f"\t=> Found Email: {emails[0]}", "green"))
 
-                            for mail in emails:
-                                _send_email(mail, job["title"], cover_letter, resume)
+        # Only the best contacts, the others are support or unrelated teams
+        for mail in emails[:self.crawler.max_recipients]:
+            # Never email the same address twice about a job, even across runs
+            if not self.db.claim_send(job["id"], mail):
+                print(colored(f"\t=> Already applied to Job {job_id} at {mail}.", "blue"))
+                continue
 
-                            return True
-                        else:
-                            continue
+            try:
+                _send_email(mail, job["title"], cover_letter, resume, \
+                            on_sent=lambda message, mail=mail: self._on_sent(job["id"], mail), \
+                            on_failed=lambda error, mail=mail: self._on_failed(job["id"], mail, error))
+            except FileNotFoundError as e:
+                # Never send an application without its cover letter and resume
+                print(colored(f"\t=> Not applying to Job {job_id}: {e}", "red"))
+                self._on_failed(job["id"], mail, e)
+                return False
 
-        return False
+        return True
@@ -0,0 +1,168 @@
+from typing import List, Sequence, Tuple
+from collections import Counter
+from scipy import sparse
+
+import numpy as np
+import zlib
+import yaml
+import re
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+
+def _tokenize(text: str) -> List[str]:
+    """
+    Splits a text into lower case terms, keeping names like c++, c# and
+    node.js in one piece.
+
+    :param text: The text.
+    :return: The terms
+    """
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def _resume_text(configuration: dict) -> str:
+    """
+    Collects the skills and projects of a resumy configuration. Keywords
+    are listed twice, they describe the applicant better than prose.
+
+    :param configuration: Parsed resume_config.yaml.
+    :return: The text to score jobs against
+    """
+    keywords = []
+    prose = []
+
+    for skill in configuration.get("skills") or []:
+        keywords.extend(str(keyword) for keyword in skill.get("keywords") or [])
+
+    for project in configuration.get("projects") or []:
+        keywords.extend(str(keyword) for keyword in project.get("keywords") or [])
+        prose.append(str(project.get("description") or ""))
+
+    return " ".join(keywords * 2 + prose)
+
+
+class JobScorer:
+    def __init__(self, resume_text: str, n_features: int = 2 ** 18) -> None:
+        """
+        Scores job descriptions against the resume with hashed TF-IDF
+        vectors, all jobs in one sparse matrix product.
+
+        :param resume_text: Text describing the applicant's skills and projects.
+        :param n_features: Number of hash buckets.
+        """
+        self.n_features = n_features
+        self.resume_terms = _tokenize(resume_text)
+
+        # Document frequencies of every job scored with `accumulate`, so
+        # jobs scored in different batches share one IDF
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.documents = 0
+
+    @classmethod
+    def from_resume(cls, path: str = "resume_config.yaml", n_features: int = 2 ** 18) -> "JobScorer":
+        """
+        Builds a scorer from the skills and projects of the resumy configuration.
+
+        :param path: Path to resume_config.yaml.
+        :param n_features: Number of hash buckets.
+        :return: The scorer
+        """
+        with open(path) as file:
+            configuration = yaml.safe_load(file) or {}
+
+        return cls(_resume_text(configuration), n_features=n_features)
+
+    def _term_counts(self, documents: Sequence[List[str]]) -> sparse.csr_matrix:
+        """
+        Builds the matrix of hashed term counts, one row per document.
+
+        :param documents: Tokenized documents.
+        :return: Sparse matrix of shape (documents, n_features)
+        """
+        buckets = {}
+        rows, columns, values = [], [], []
+
+        for row, terms in enumerate(documents):
+            term_counts = Counter(terms)
+
+            for term in term_counts:
+                if term not in buckets:
+                    # crc32 rather than hash(), which changes between runs
+                    buckets[term] = zlib.crc32(term.encode()) % self.n_features
+
+            rows.extend([row] * len(term_counts))
+            columns.extend(buckets[term] for term in term_counts)
+            values.extend(term_counts.values())
+
+        counts = sparse.csr_matrix(
+            (np.array(values, dtype=np.float32), (rows, columns)),
+            shape=(len(documents), self.n_features)
+        )
+        counts.sum_duplicates()
+
+        return counts
+
+    def score(self, descriptions: Sequence[str], accumulate: bool = False) -> np.ndarray:
+        """
+        Scores job descriptions against the resume.
+
+        :param descriptions: The job descriptions.
+        :param accumulate: Add the descriptions to the document frequencies
+            kept by the scorer and use those for the IDF, instead of the
+            descriptions alone. Scores of jobs scored in batches are then
+            comparable, and closer to the final IDF with every batch.
+        :return: Cosine similarity of every description, between 0 and 1
+        """
+        if not descriptions or not self.resume_terms:
+            return np.zeros(len(descriptions), dtype=np.float32)
+
+        counts = self._term_counts([self.resume_terms] + [_tokenize(text) for text in descriptions])
+
+        # Sublinear term frequency, smoothed inverse document frequency
+        counts.data = 1 + np.log(counts.data)
+        document_frequency = np.bincount(counts.indices, minlength=self.n_features)
+        documents = counts.shape[0]
+
+        if accumulate:
+            resume_frequency = np.bincount(counts[0].indices, minlength=self.n_features)
+            self.document_frequency += document_frequency - resume_frequency
+            self.documents += len(descriptions)
+
+            document_frequency = self.document_frequency + resume_frequency
+            documents = self.documents + 1
+
+        idf = np.log((1 + documents) / (1 + document_frequency)).astype(np.float32) + 1
+
+        weights = counts @ sparse.diags(idf)
+        norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        weights = sparse.diags(1 / norms) @ weights
+
+        return np.asarray(weights[1:] @ weights[0].T.toarray()).ravel()
+
+    def select(self, jobs: Sequence, top_k: int = None, threshold: float = None, \
+               field: str = "job_description_markdown", accumulate: bool = False) -> List[Tuple[object, float]]:
+        """
+        Keeps the jobs that fit the resume best.
+
+        :param jobs: Jobs, each indexable by `field`.
+        :param top_k: Keep at most this many jobs.
+        :param threshold: Keep only jobs scoring at least this much.
+        :param field: Key of the job description.
+        :param accumulate: Score with the document frequencies of every
+            batch so far, see `score`.
+
+        :return: (job, score) tuples, best first
+        """
+        jobs = list(jobs)
+        scores = self.score([job[field] for job in jobs], accumulate=accumulate)
+        order = np.argsort(-scores, kind="stable")
+
+        if threshold is not None:
+            order = order[scores[order] >= threshold]
+
+        if top_k:
+            order = order[:top_k]
+
+        return [(jobs[index], float(scores[index])) for index in order]
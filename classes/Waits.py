@@ -0,0 +1,104 @@
+from selenium.webdriver.support import expected_conditions
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from termcolor import colored
+from typing import Any, Callable, Dict
+from classes.Metrics import metrics
+
+import threading
+import time
+
+# Per call site: number of waits, seconds actually waited, seconds budgeted
+_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+_RESOURCE_COUNT_SCRIPT = "return [document.readyState, performance.getEntriesByType('resource').length];"
+
+
+def element_present(by: str, value: str) -> Callable:
+    """
+    Condition met once an element is in the DOM.
+
+    :param by: Locator strategy, e.g. By.ID.
+    :param value: Locator value.
+    :return: The condition
+    """
+    return expected_conditions.presence_of_element_located((by, value))
+
+
+def network_idle(idle_time: float = 0.5) -> Callable:
+    """
+    Condition met once the document is loaded and no new resource was
+    requested for `idle_time` seconds.
+
+    :param idle_time: Quiet period, in seconds.
+    :return: The condition
+    """
+    state = {"count": -1, "since": 0.0}
+
+    def condition(driver) -> bool:
+        ready_state, count = driver.execute_script(_RESOURCE_COUNT_SCRIPT)
+        now = time.monotonic()
+
+        if ready_state != "complete" or count != state["count"]:
+            state["count"] = count
+            state["since"] = now
+            return False
+
+        return now - state["since"] >= idle_time
+
+    return condition
+
+
+def wait_for(driver, condition: Callable, timeout: float, site: str, poll_frequency: float = 0.05) -> Any:
+    """
+    Waits until a condition is met or the timeout expires, and records the
+    time actually waited against the budget for the call site.
+
+    :param driver: The WebDriver.
+    :param condition: Callable receiving the driver, e.g. `element_present(...)`.
+    :param timeout: Budget in seconds.
+    :param site: Name of the call site in the wait report.
+    :param poll_frequency: Seconds between checks.
+
+    :return: The condition's result, or None on timeout
+    """
+    start = time.perf_counter()
+
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(condition)
+    except TimeoutException:
+        result = None
+        print(colored(f"=> Timed out after {timeout}s waiting at {site}", "yellow"))
+
+    waited = time.perf_counter() - start
+    metrics.observe("wait", waited, site=site, status="timeout" if result is None else "ok")
+
+    with _stats_lock:
+        stats = _stats.setdefault(site, {"calls": 0, "waited": 0.0, "budget": 0.0, "timeouts": 0})
+        stats["calls"] += 1
+        stats["waited"] += waited
+        stats["budget"] += timeout
+        stats["timeouts"] += result is None
+
+    return result
+
+
+def wait_report() -> Dict[str, Dict[str, float]]:
+    """
+    Returns the wait statistics of every call site.
+
+    :return: Dictionary of call site to {"calls", "waited", "budget", "timeouts"}
+    """
+    with _stats_lock:
+        return {site: dict(stats) for site, stats in _stats.items()}
+
+
+def print_wait_report() -> None:
+    """
+    Prints how long each call site waited, compared to its budget.
+    """
+    for site, stats in sorted(wait_report().items()):
+        print(colored(f"=> Waits at {site}: {stats['calls']} calls, " \
+                      f"{stats['waited']:.2f}s waited of {stats['budget']:.0f}s budgeted, " \
+                      f"{stats['timeouts']} timeouts", "blue"))
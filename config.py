@@ -1,5 +1,101 @@
+from dataclasses import dataclass, field, fields
+
+import threading
 import json
 
+CONFIG_PATH = "config.json"
+
+# Expected type of every known setting, per section. Unknown keys are kept as they are.
+_SCHEMA = {
+    "chrome": {"userDataDir": str, "profileName": str, "headless": bool, "binary": str, "daemon": dict, \
+               "lean": dict},
+    "indeed": {"jobQuery": str, "placeQuery": str, "parallelism": int, "fastParse": bool, \
+               "incremental": bool, "staleAfterHours": (int, float), "maxPages": int, \
+               "maxJobs": (int, type(None)), "waitTimeout": (int, float), "keywords": str, "baseUrl": str},
+    "smtp": {"sender_name": str, "host": str, "port": int, "secure": bool, "insecure": bool, \
+             "auth": dict},
+    "llm": {"model": str, "baseUrl": str, "apiKey": (str, type(None)), "concurrency": int, \
+            "interactive": bool, "requestsPerMinute": (int, float), "burst": int, \
+            "timeout": (int, float), "maxRetries": int, "backoffSeconds": (int, float), "cache": dict},
+    "pdf": {"css": str, "workers": (int, type(None))},
+    "resume": {"theme": str, "themes": list},
+    "crawler": {"maxDepth": int, "maxPages": int, "concurrency": int, "perDomain": int, \
+                "timeout": (int, float), "cacheDays": (int, float), "maxRecipients": int},
+    "scoring": {"enabled": bool, "topK": (int, type(None)), "threshold": (int, float)},
+    "dedup": {"enabled": bool, "threshold": (int, float)},
+    "pipeline": {"queueSize": int, "batchSize": int, "parseWorkers": int, "sendWorkers": int, \
+                 "maxAttempts": int},
+    "metrics": {"enabled": bool, "format": str, "path": (str, type(None)), "maxSpans": int}
+}
+
+# Sections every config.json has to define
+_REQUIRED_SECTIONS = ("chrome", "indeed", "smtp")
+
+_config = None
+_config_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Config:
+    chrome: dict
+    indeed: dict
+    smtp: dict
+    llm: dict = field(default_factory=dict)
+    pdf: dict = field(default_factory=dict)
+    resume: dict = field(default_factory=dict)
+    crawler: dict = field(default_factory=dict)
+    scoring: dict = field(default_factory=dict)
+    dedup: dict = field(default_factory=dict)
+    pipeline: dict = field(default_factory=dict)
+    metrics: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Config":
+        """
+        Validates the parsed config.json.
+
+        :param data: The parsed file.
+        :return: The config
+        """
+        for section in _REQUIRED_SECTIONS:
+            if section not in data:
+                raise ValueError(f"config.json is missing the \"{section}\" section")
+
+        for section in fields(cls):
+            settings = data.get(section.name, {})
+
+            if not isinstance(settings, dict):
+                raise ValueError(f"config.json: \"{section.name}\" must be an object")
+
+            for key, expected in _SCHEMA[section.name].items():
+                value = settings.get(key)
+
+                # bool is an int, but an int setting set to true is a mistake
+                if key in settings and (not isinstance(value, expected) or \
+                                        (isinstance(value, bool) and expected is not bool)):
+                    raise ValueError(f"config.json: \"{section.name}.{key}\" has the wrong type " \
+                                     f"({type(value).__name__})")
+
+        return cls(**{section.name: data.get(section.name, {}) for section in fields(cls)})
+
+
+def load_config(path: str = None) -> Config:
+    """
+    Returns the config, read and validated on the first call only.
+
+    :param path: Read this file instead of config.json, and keep it for the
+        rest of the process.
+    :return: The config
+    """
+    global _config
+
+    with _config_lock:
+        if _config is None or path is not None:
+            with open(path or CONFIG_PATH) as file:
+                _config = Config.from_dict(json.load(file))
+
+    return _config
+
 
 def get_chrome_config() -> dict:
     """
@@ -7,7 +103,7 @@ def get_chrome_config() -> dict:
 
     :return: A dictionary with the chrome settings in them
     """
-    return json.load(open("config.json"))["chrome"]
+    return load_config().chrome
 
 
 def get_indeed_settings() -> dict:
@@ -16,7 +112,7 @@ def get_indeed_settings() -> dict:
 
     :return: A dictionary with the Indeed settings
     """
-    return json.load(open("config.json"))["indeed"]
+    return load_config().indeed
 
 def get_smtp_settings() -> dict:
     """
@@ -24,4 +120,68 @@ def get_smtp_settings() -> dict:
 
     :return: A dictionary with the SMTP settings
     """
-    return json.load(open("config.json"))["smtp"]
+    return load_config().smtp
+
+def get_llm_settings() -> dict:
+    """
+    Returns a dictionary of the LLM settings, such as the model and concurrency.
+
+    :return: A dictionary with the LLM settings
+    """
+    return load_config().llm
+
+def get_pdf_settings() -> dict:
+    """
+    Returns a dictionary of the PDF settings, such as the stylesheet and workers.
+
+    :return: A dictionary with the PDF settings
+    """
+    return load_config().pdf
+
+def get_resume_settings() -> dict:
+    """
+    Returns a dictionary of the resume settings, such as the theme.
+
+    :return: A dictionary with the resume settings
+    """
+    return load_config().resume
+
+def get_crawler_settings() -> dict:
+    """
+    Returns a dictionary of the email crawler settings, such as depth and page limits.
+
+    :return: A dictionary with the crawler settings
+    """
+    return load_config().crawler
+
+def get_scoring_settings() -> dict:
+    """
+    Returns a dictionary of the job scoring settings, such as top-K and threshold.
+
+    :return: A dictionary with the scoring settings
+    """
+    return load_config().scoring
+
+def get_dedup_settings() -> dict:
+    """
+    Returns a dictionary of the near-duplicate detection settings, such as the threshold.
+
+    :return: A dictionary with the dedup settings
+    """
+    return load_config().dedup
+
+def get_pipeline_settings() -> dict:
+    """
+    Returns a dictionary of the pipeline settings, such as queue size and workers per stage.
+
+    :return: A dictionary with the pipeline settings
+    """
+    return load_config().pipeline
+
+def get_metrics_settings() -> dict:
+    """
+    Returns a dictionary of the metrics settings, such as the export format and path.
+
+    :return: A dictionary with the metrics settings
+    """
+    return load_config().metrics
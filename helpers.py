@@ -1,30 +1,62 @@
-from config import get_smtp_settings
+from config import get_smtp_settings, get_llm_settings, get_resume_settings, get_scoring_settings, \
+    get_indeed_settings, get_pipeline_settings
+from concurrent.futures import ThreadPoolExecutor
 from termcolor import colored
-from g4f.client import Client
-
+from classes.PDFRenderer import get_pdf_renderer
+from classes.Mailer import get_mailer
+from classes.Database import Database
+from classes.Pipeline import Pipeline, Stage
+from classes.GPT import GPT
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+import contextlib
 import subprocess
-import smtplib
+import itertools
+import threading
+import hashlib
+import asyncio
+import heapq
+import json
+import time
 import yaml
-import ssl
+import sys
+import re
 import os
 
+DRAFTS_DIR = "drafts"
+RESUME_CONFIG_PATH = "resume_config.yaml"
+RESUME_MANIFEST_PATH = "resume_manifest.json"
+COVER_LETTERS_DIR = "cover_letters"
+
+# Held by the pipeline thread asking the user, see _console
+_console_lock = threading.Lock()
+
+# Selenium, NumPy and SciPy are slow to import, so they are only loaded by the stages using them
+if TYPE_CHECKING:
+    from classes.DriverPool import DriverPool
+
 ALLOWED_IMAGE_EXTENSIONS = [
     ".png",
     ".jpg",
     ".jpeg",
 ]
 
-def _kill_chrome() -> None:
-    # Helper function to kill chrome
-    response = None
+def _kill_chrome(user_data_dir: str) -> None:
+    # Helper function to kill the Chrome holding jobber's profile, other Chrome processes are left alone
+    flag = f"--user-data-dir={user_data_dir}"
+
     if os.name == "posix":
-        response = subprocess.run(["pkill", "chrome"])
+        response = subprocess.run(["pkill", "-f", "--", re.escape(flag)])
     else:
-        response = subprocess.run(["taskkill", "/IM", "chrome.exe", "/F"])
+        pattern = flag.replace("'", "''")
+        response = subprocess.run([
+            "powershell", "-NoProfile", "-Command",
+            "$p = Get-CimInstance Win32_Process -Filter \"Name = 'chrome.exe'\" | " \
+            f"Where-Object {{ $_.CommandLine -and $_.CommandLine.Contains('{pattern}') }}; " \
+            "$p | Invoke-CimMethod -MethodName Terminate | Out-Null; if (-not $p) { exit 1 }"
+        ])
     if response.returncode == 0:
         print(colored("Chrome Killed Successfully!", "green"))
-    else:
-        print(colored("Error Killing Chrome!", "red"))
 
 def _check_image(path: str) -> bool:
     if os.path.exists(path):
@@ -125,8 +157,8 @@ def _get_information() -> dict:
         "work_experience": work_experience
     }
 
-def _populate_configuration(info) -> None:
-    print(info)
+def _render_configuration(info) -> str:
+    # Helper function to render the resumy configuration as YAML
     basics = {
         "email": info["email"],
         "location": {
@@ -181,8 +213,21 @@ def _populate_configuration(info) -> None:
         "work": work
     }
 
-    with open("resume_config.yaml", "w") as file:
-        yaml.dump(configuration, file)
+    return yaml.dump(configuration)
+
+def _populate_configuration(info) -> str:
+    # Helper function to write the resumy configuration, only if it changed
+    configuration = _render_configuration(info)
+
+    if os.path.exists(RESUME_CONFIG_PATH):
+        with open(RESUME_CONFIG_PATH) as file:
+            if file.read() == configuration:
+                return configuration
+
+    with open(RESUME_CONFIG_PATH, "w") as file:
+        file.write(configuration)
+
+    return configuration
 
 def get_default_theme_location() -> str:
     venv_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -198,58 +243,132 @@ def get_default_theme_location() -> str:
 
     return default_theme
 
-def _generate_resume(info: dict) -> None:
-    # Helper function to generate resume
-    _populate_configuration(info)
+def _hash_resume_inputs(configuration: str, theme: str) -> str:
+    """
+    Hashes everything a resume build depends on: the rendered configuration,
+    the theme and the size and modification time of the theme's files.
+
+    :param configuration: The rendered resumy configuration.
+    :param theme: Theme name or path.
 
-    theme = input(colored("> What theme would you like to use? (Default: prairie) ", "blue") \
-                    or get_default_theme_location())
+    :return: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(configuration.encode())
+    digest.update(b"\0" + theme.encode())
 
+    if os.path.isdir(theme):
+        for root, _, files in sorted(os.walk(theme)):
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{os.path.relpath(os.path.join(root, name), theme)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    return digest.hexdigest()
+
+def _load_resume_manifest() -> dict:
+    # Helper function to load the hashes of the built resumes
+    if not os.path.exists(RESUME_MANIFEST_PATH):
+        return {}
+
+    with open(RESUME_MANIFEST_PATH) as file:
+        return json.load(file)
+
+def _build_resume(theme: str, output: str) -> bool:
+    # Helper function to build one resume with resumy
     response = subprocess.run([
         "resumy",
         "build",
         "-o",
-        "resume.pdf",
+        output,
         "--theme",
         theme,
-        "resume_config.yaml",
+        RESUME_CONFIG_PATH,
     ])
 
-    if response.returncode == 0:
-        print(colored("Resume Generated Successfully!", "green"))
-    else:
-        print(colored("Error Generating Resume!", "red"))
+    return response.returncode == 0
+
+def _generate_resumes(info: dict, themes: Dict[str, str]) -> Dict[str, str]:
+    """
+    Builds one resume per theme, in parallel. Resumes whose configuration
+    and theme didn't change since the last build are reused.
+
+    :param info: The user information to use in the resumes.
+    :param themes: Dictionary of theme name or path to output PDF path.
+
+    :return: Dictionary of theme to resume path, for successful builds.
+    """
+    configuration = _populate_configuration(info)
+    manifest = _load_resume_manifest()
+
+    resumes = {}
+    to_build = {}
+
+    for theme, output in themes.items():
+        digest = _hash_resume_inputs(configuration, theme)
+
+        if manifest.get(output) == digest and os.path.exists(output):
+            print(colored(f"=> Resume {output} is up to date.", "blue"))
+            resumes[theme] = output
+        else:
+            to_build[theme] = (output, digest)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(to_build))) as executor:
+        built = executor.map(lambda theme: _build_resume(theme, to_build[theme][0]), to_build)
+
+        for theme, ok in zip(to_build, built):
+            output, digest = to_build[theme]
+
+            if ok:
+                print(colored(f"Resume {output} Generated Successfully!", "green"))
+                resumes[theme] = output
+                manifest[output] = digest
+            else:
+                print(colored(f"Error Generating Resume {output}!", "red"))
+                manifest.pop(output, None)
+
+    with open(RESUME_MANIFEST_PATH, "w") as file:
+        json.dump(manifest, file, indent=2)
+
+    return resumes
+
+def _generate_resume(info: dict, theme: str = None) -> str:
+    """
+    Builds the resume, reusing resume.pdf if nothing changed since the last build.
+    Themes listed in `resume.themes` are built alongside, to resume-<theme>.pdf.
+
+    :param info: The user information to use in the resume.
+    :param theme: Theme name or path. Defaults to `resume.theme` in the
+        config, otherwise asks for it.
+
+    :return: The resume's path, or None if the build failed.
+    """
+    resume_settings = get_resume_settings()
+
+    theme = theme or resume_settings.get("theme") or \
+        input(colored("> What theme would you like to use? (Default: prairie) ", "blue")) or \
+        get_default_theme_location()
+
+    themes = {theme: "resume.pdf"}
+    for variant in resume_settings.get("themes", []):
+        themes.setdefault(variant, f"resume-{os.path.basename(variant.rstrip(os.sep))}.pdf")
+
+    return _generate_resumes(info, themes).get(theme)
 
 def _turn_markdown_to_pdf(markdown_path: str, pdf_path: str) -> None:
     # Helper function to turn markdown to pdf
-    response = subprocess.run([
-        "md2pdf",
-        markdown_path,
-        pdf_path,
-        "--css",
-        "css/md2pdf.css"
-    ])
+    with open(markdown_path) as file:
+        markdown_text = file.read()
 
-    if response.returncode == 0:
+    try:
+        get_pdf_renderer().render(markdown_text, pdf_path)
         print(colored("=> Markdown to PDF Conversion Successful!", "green"))
-    else:
-        print(colored("=> Error Converting Markdown to PDF!", "red"))
-
-def _send_email(email: str, subject: str, cover_letter_path: str, resume_path: str) -> None:
-    # Helper function to send email
-    # Combine cover letter and resume
-    attachment = "application.zip"
-    response = subprocess.run([
-        "zip",
-        attachment,
-        cover_letter_path,
-        resume_path
-    ])
-
-    if response.returncode != 0:
-        print(colored("Error Creating Attachment!", "red"))
-        return
+    except Exception as e:
+        print(colored(f"=> Error Converting Markdown to PDF! ({e})", "red"))
 
+def _send_email(email: str, subject: str, cover_letter_path: str, resume_path: str, \
+                on_sent: Callable = None, on_failed: Callable = None) -> None:
+    # Helper function to queue an application email, with the cover letter and resume attached.
+    # on_sent and on_failed are passed on to Mailer.send
     smtp_settings = get_smtp_settings()
 
     message = f"""Dear Hiring Manager,
@@ -262,33 +381,73 @@ Thank you for considering my application.
 Best Regards,
 {smtp_settings['sender_name']}
 """
-    
-    context = ssl.create_default_context()
 
-    with smtplib.SMTP_SSL(smtp_settings["host"], smtp_settings["port"], context=context) as server:
-        server.login(smtp_settings["auth"]["user"], smtp_settings["auth"]["pass"])
+    get_mailer().send(email, subject, message, [cover_letter_path, resume_path], \
+                      on_sent=on_sent, on_failed=on_failed)
 
-        message = f"Subject: {subject}\n\n{message}"
-        server.sendmail(smtp_settings["auth"]["user"], email, message)
+    print(colored(f"=> Email to {email} Queued!", "blue"))
 
-        with open(attachment, "rb") as file:
-            server.sendmail(smtp_settings["auth"]["user"], email, file.read())
+def _pick_cluster_representatives(jobs: List[dict]) -> List[dict]:
+    """
+    Keeps the first job of every near-duplicate cluster, so each posting
+    only gets one cover letter and one email.
+
+    :param jobs: The jobs, each with an "id" and "cluster_id".
+    :return: The jobs, without duplicates
+    """
+    representatives = {}
 
-    print(colored("Email Sent Successfully!", "green"))
+    for job in jobs:
+        representatives.setdefault(job["cluster_id"] or job["id"], job)
 
-def _generate_cover_letter(job_description: str, info: dict) -> str:
+    if len(representatives) < len(jobs):
+        print(colored(f"=> Skipping {len(jobs) - len(representatives)} duplicate Jobs.", "blue"))
+
+    return list(representatives.values())
+
+def _rank_jobs(jobs: List[dict], info: dict) -> List[dict]:
     """
-    Generates a cover letter in Markdown format, then converts it to PDF.
+    Keeps the jobs that fit the resume best, as configured by the `scoring`
+    settings, so cover letters are only written for those.
 
-    :param job_description: The job description to generate the cover letter for.
-    :param info: The user information to use in the cover letter.
+    :param jobs: The jobs, each with an "id" and "job_description_markdown".
+    :param info: The user information, used to write resume_config.yaml.
 
-    :return: The cover letter's path in PDF format.    
+    :return: The kept jobs, best first
     """
-    client = Client()
+    scoring_settings = get_scoring_settings()
 
-    # Generate using ChatGPT
-    prompt = f"""Hello, ChatGPT!
+    if not jobs or not scoring_settings.get("enabled", True):
+        return jobs
+
+    from classes.Scorer import JobScorer
+
+    # Score against the same skills and projects the resume is built from
+    _populate_configuration(info)
+
+    ranked = JobScorer.from_resume(RESUME_CONFIG_PATH).select(
+        jobs,
+        top_k=scoring_settings.get("topK"),
+        threshold=scoring_settings.get("threshold", 0)
+    )
+
+    print(colored(f"=> Kept {len(ranked)} of {len(jobs)} Jobs matching the Resume", "blue"))
+
+    for job, score in ranked:
+        print(colored(f"\t=> Job {job['id']}: {score:.3f}", "blue"))
+
+    return [job for job, _ in ranked]
+
+def _build_cover_letter_prompt(job_description: str, profile_context: str) -> str:
+    """
+    Builds the prompt used to generate a cover letter.
+
+    :param job_description: The job description to generate the cover letter for.
+    :param profile_context: The precompiled user information, see `Profile.prompt_context`.
+
+    :return: The prompt.
+    """
+    return f"""Hello, ChatGPT!
 Please generate a cover letter for a job application. The cover letter should be
 returned in Markdown format. Only return the cover letter text, no need for the
 front matter. DO NOT reference this prompt or explain what you are doing.
@@ -303,46 +462,525 @@ Job Description:
 
 User Information:
 
-Full Name: {info["full_name"]}
-Email: {info["email"]}
-City: {info["city"]}
-Country: {info["country"]}
-Phone Number: {info["phone_number"]}
-Profiles: {info["profiles"]}
-Skills: {info["skills"]}
-Educations: {info["educations"]}
-Projects: {info["projects"]}
+{profile_context}
 
 ---
 
 Thank you!
 """
+
+def _save_cover_letters(cover_letters: Dict[str, str]) -> Dict[str, str]:
+    """
+    Writes approved cover letters to their own Markdown files and converts
+    them to PDF in one batch.
+
+    :param cover_letters: Dictionary of unique name (e.g. the job ID) to cover letter, in Markdown.
+
+    :return: Dictionary of name to the cover letter's path in PDF format,
+        without the letters that failed to render.
+    """
+    os.makedirs(COVER_LETTERS_DIR, exist_ok=True)
+
+    names = []
+    letters = []
+
+    for name, cover_letter in cover_letters.items():
+        with open(os.path.join(COVER_LETTERS_DIR, f"{name}.md"), "w") as file:
+            file.write(cover_letter)
+
+        names.append(name)
+        letters.append((cover_letter, os.path.join(COVER_LETTERS_DIR, f"{name}.pdf")))
+
+    if not letters:
+        return {}
+
+    # Convert to PDF, a failed letter doesn't take the rest of the batch with it
+    start = time.perf_counter()
+
+    try:
+        rendered = get_pdf_renderer().render_batch(letters)
+    except Exception as e:
+        print(colored(f"=> Error Converting Markdown to PDF! ({e})", "red"))
+        return {}
+
+    pdf_paths = {name: pdf_path for name, pdf_path in zip(names, rendered) if pdf_path is not None}
+
+    elapsed = time.perf_counter() - start
+    print(colored(f"=> Rendered {len(pdf_paths)} of {len(letters)} Cover Letters in {elapsed:.2f}s " \
+                  f"({len(letters) / elapsed:.1f}/s)", "green"))
+
+    return pdf_paths
+
+def _save_cover_letter(cover_letter: str, name: str) -> str:
+    """
+    Writes an approved cover letter to its own Markdown file and converts it to PDF.
+
+    :param cover_letter: The cover letter, in Markdown.
+    :param name: Unique name of the letter, e.g. the job ID.
+
+    :return: The cover letter's path in PDF format.
+    """
+    return _save_cover_letters({name: cover_letter}).get(name)
+
+class _HeldOutput:
+    def __init__(self, stream, owner: int) -> None:
+        """
+        Stands in for stdout while a thread waits for the user's answer.
+        Output of the other threads is kept until the answer was given.
+
+        :param stream: The real stdout.
+        :param owner: Ident of the prompting thread.
+        """
+        self.stream = stream
+        self.owner = owner
+        self.held = []
+
+    def write(self, text: str) -> int:
+        if threading.get_ident() == self.owner:
+            return self.stream.write(text)
+
+        self.held.append(text)
+
+        return len(text)
+
+    def flush(self) -> None:
+        if threading.get_ident() == self.owner:
+            self.stream.flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self.stream, name)
+
+@contextlib.contextmanager
+def _console():
+    # Helper function to own the terminal while prompting, from any thread
+    with _console_lock:
+        stream = sys.stdout
+        sys.stdout = _HeldOutput(stream, threading.get_ident())
+
+        try:
+            yield
+        finally:
+            held, sys.stdout = sys.stdout.held, stream
+            stream.write("".join(held))
+            stream.flush()
+
+def _review_cover_letter(cover_letter: str) -> bool:
+    # Helper function to ask the user whether a cover letter is okay
+    with _console():
+        print(cover_letter)
+
+        return input(colored("> Is the cover letter okay? (Y/N) ", "blue")).lower() == "y"
+
+def _generate_cover_letter(job_description: str, profile_context: str) -> str:
+    """
+    Generates a cover letter in Markdown format, then converts it to PDF.
+
+    :param job_description: The job description to generate the cover letter for.
+    :param profile_context: The precompiled user information, see `Profile.prompt_context`.
+
+    :return: The cover letter's path in PDF format.    
+    """
+    # Generate using ChatGPT
+    prompt = _build_cover_letter_prompt(job_description, profile_context)
+
     is_ok = False
+    use_cache = True
 
     while not is_ok:
-        cover_letter = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        ).choices[0].message.content
+        cover_letter = GPT.shared().ask(prompt, use_cache=use_cache)
+        use_cache = False
 
         print(colored("=> Cover Letter Generated Successfully!", "green"))
-        print(cover_letter)
 
-        is_ok_unparsed = input(colored("> Is the cover letter okay? (Y/N) ", "blue"))
+        is_ok = _review_cover_letter(cover_letter)
+
+    return _save_cover_letter(cover_letter, "cover_letter")
 
-        if is_ok_unparsed.lower() == "y":
-            is_ok = True
+async def _generate_cover_letters_async(jobs: List[dict], profile_context: str, concurrency: int, \
+                                        gpt: GPT = None) -> Dict[str, str]:
+    """
+    Generates cover letters for many jobs at once.
 
-    cover_letter_path = "cover_letter.md"
-    with open(cover_letter_path, "w") as file:
+    :param jobs: The jobs, each with an "id" and "job_description_markdown".
+    :param profile_context: The precompiled user information, see `Profile.prompt_context`.
+    :param concurrency: Maximum number of requests in flight.
+    :param gpt: Client to use instead of the shared one.
+
+    :return: Dictionary of job ID to cover letter, None for failed jobs.
+    """
+    gpt = gpt or GPT.shared()
+    semaphore = asyncio.Semaphore(concurrency)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+
+    async def generate(job):
+        prompt = _build_cover_letter_prompt(job["job_description_markdown"], profile_context)
+
+        async with semaphore:
+            try:
+                cover_letter = await asyncio.to_thread(gpt.ask, prompt)
+            except Exception as e:
+                print(colored(f"=> Error Generating Cover Letter for Job {job['id']}: {e}", "red"))
+                return job["id"], None
+
+        print(colored(f"=> Cover Letter Generated for Job {job['id']}!", "green"))
+
+        return job["id"], cover_letter
+
+    return dict(await asyncio.gather(*(generate(job) for job in jobs)))
+
+def _queue_draft(job_id, cover_letter: str, db: Database = None) -> str:
+    # Helper function to queue a cover letter in the drafts directory for `_review_drafts`
+    os.makedirs(DRAFTS_DIR, exist_ok=True)
+    draft_path = os.path.join(DRAFTS_DIR, f"{job_id}.md")
+
+    with open(draft_path, "w") as file:
         file.write(cover_letter)
 
-    # Convert to PDF
-    pdf_path = "cover_letter.pdf"
-    _turn_markdown_to_pdf(cover_letter_path, pdf_path)
+    # Drafted jobs are left alone by later runs until they are reviewed
+    if db:
+        db.set_application_state(int(job_id), "drafted", cover_letter_path=draft_path)
+
+    return draft_path
+
+def _generate_cover_letters(jobs: List[dict], profile_context: str, concurrency: int = None, interactive: bool = None, \
+                            db: Database = None) -> Dict[str, str]:
+    """
+    Generates cover letters for many jobs with bounded concurrency.
+
+    In interactive mode, every letter is shown for approval once all of them
+    are generated, and approved letters are converted to PDF. Otherwise, the
+    letters are queued in the drafts directory for `_review_drafts`.
+
+    :param jobs: The jobs, each with an "id" and "job_description_markdown".
+    :param profile_context: The precompiled user information, see `Profile.prompt_context`.
+    :param concurrency: Maximum number of requests in flight. Defaults to the config.
+    :param interactive: Whether to ask for approval now. Defaults to the config.
+    :param db: Database to mark the queued jobs "drafted" in.
+
+    :return: Dictionary of job ID to approved cover letter path in PDF format,
+        empty in non-interactive mode.
+    """
+    llm_settings = get_llm_settings()
+    concurrency = concurrency or llm_settings.get("concurrency", 4)
+    interactive = llm_settings.get("interactive", True) if interactive is None else interactive
+
+    cover_letters = asyncio.run(_generate_cover_letters_async(jobs, profile_context, concurrency))
+
+    cache = GPT.shared().cache
+    if cache:
+        stats = cache.stats()
+        print(colored(f"=> LLM Cache: {stats['hits']} Hits, {stats['misses']} Misses", "blue"))
+
+    approved = {}
+    queued = 0
+
+    for job in jobs:
+        cover_letter = cover_letters.get(job["id"])
+
+        if cover_letter is None:
+            continue
+
+        if not interactive:
+            _queue_draft(job["id"], cover_letter, db)
+            queued += 1
+            continue
+
+        while not _review_cover_letter(cover_letter):
+            cover_letter = GPT.shared().ask(
+                _build_cover_letter_prompt(job["job_description_markdown"], profile_context),
+                use_cache=False
+            )
+
+        approved[job["id"]] = cover_letter
+
+    if not interactive:
+        print(colored(f"=> Queued {queued} Cover Letters for Review in {DRAFTS_DIR}/", "green"))
+
+    return _save_cover_letters(approved)
+
+def _review_drafts(db: Database = None, profile_context: str = None) -> Dict[str, str]:
+    """
+    Asks for approval of every queued cover letter draft. Approved drafts are
+    converted to PDF, skipped ones stay queued. Rejected ones are deleted and
+    dropped from the LLM cache, and their job goes back to "parsed", so the
+    next run writes a new letter instead of queueing the same one again.
+
+    :param db: Database tracking the applications.
+    :param profile_context: The precompiled user information the drafts were
+        written with, see `Profile.prompt_context`.
+
+    :return: Dictionary of job ID to approved cover letter path in PDF format.
+    """
+    approved = {}
+    approved_drafts = []
+
+    if not os.path.isdir(DRAFTS_DIR):
+        return approved
+
+    for draft in sorted(os.listdir(DRAFTS_DIR)):
+        if not draft.endswith(".md"):
+            continue
+
+        job_id = draft[:-len(".md")]
+        draft_path = os.path.join(DRAFTS_DIR, draft)
+
+        with open(draft_path) as file:
+            cover_letter = file.read()
+
+        print(colored(f"=> Cover Letter for Job {job_id}:", "blue"))
+        print(cover_letter)
+
+        answer = input(colored("> Is the cover letter okay? (Y/N/S to skip) ", "blue")).lower()
+
+        if answer == "y":
+            approved[job_id] = cover_letter
+            approved_drafts.append(draft_path)
+        elif answer == "n":
+            os.remove(draft_path)
+
+            if db:
+                job = db.get_job(int(job_id), columns=("job_description_markdown",))
+
+                if job and job["job_description_markdown"] and profile_context is not None:
+                    GPT.shared().forget(_build_cover_letter_prompt(job["job_description_markdown"], profile_context))
+
+                db.set_application_state(int(job_id), "parsed", error="Cover letter rejected")
+
+    pdf_paths = _save_cover_letters(approved)
+
+    for draft_path in approved_drafts:
+        os.remove(draft_path)
+
+    return pdf_paths
+
+def _build_pipeline(indeed, profile_context: str, resume_path: str, pool: "DriverPool" = None) -> Pipeline:
+    """
+    Builds the application pipeline: detail parse, database write, scoring,
+    cover letter generation, review, PDF render and send, each stage on its
+    own workers as configured by the `pipeline` settings.
+
+    :param indeed: The Indeed provider, with a database.
+    :param profile_context: The precompiled user information, see `Profile.prompt_context`.
+    :param resume_path: Path of the resume to attach.
+    :param pool: Chrome workers for pages the HTTP parser can't read.
+
+    :return: The pipeline, to run over single listings from `Indeed.iter_listings`.
+    """
+    from classes.Scorer import JobScorer
+
+    pipeline_settings = get_pipeline_settings()
+    scoring_settings = get_scoring_settings()
+    llm_settings = get_llm_settings()
+
+    batch_size = pipeline_settings.get("batchSize", 16)
+    interactive = llm_settings.get("interactive", True)
+    keywords = get_indeed_settings().get("keywords")
+    scorer = JobScorer.from_resume(RESUME_CONFIG_PATH) if scoring_settings.get("enabled", True) else None
+    max_attempts = pipeline_settings.get("maxAttempts", 3)
+    top_k = scoring_settings.get("topK")
+
+    # The best `topK` jobs of the run so far, as a min-heap of (score, order, job)
+    best = []
+    order = itertools.count()
+
+    def parse(job):
+        application = indeed.db.get_application(job["id"]) or {}
+        state = application.get("state")
+
+        # Drafted jobs wait for `--review`, which approves or rejects them
+        if state in ("sent", "drafted"):
+            return None
+
+        if state == "failed" and application["attempts"] >= max_attempts:
+            print(colored(f"=> Giving up on Job {job['id']} after {application['attempts']} attempts.", "red"))
+            return None
+
+        # Resume from the cover letter of an earlier run, rendered or approved
+        path = application.get("cover_letter_path")
+
+        if path and os.path.exists(path):
+            if path.endswith(".pdf"):
+                job["cover_letter_path"] = path
+            else:
+                with open(path) as file:
+                    job["cover_letter"] = file.read()
+
+        if "cover_letter" in job or "cover_letter_path" in job or not indeed.needs_parse(job):
+            # Continue with the stored description
+            job.update(indeed.db.get_job(job["id"], columns=("job_description_markdown", "cluster_id")) or {})
+            return job, None
+
+        parsed = indeed.parse_job(job, pool)
+
+        if parsed is None:
+            indeed.db.set_application_state(job["id"], "failed", error="Couldn't parse the job page")
+            return None
+
+        return job, parsed
+
+    def write(pairs):
+        parsed_jobs = [indeed.update_parsed_job(job, parsed) for job, parsed in pairs if parsed is not None]
+        indeed.db.upsert_jobs(parsed_jobs)
+
+        for job in parsed_jobs:
+            indeed.db.set_application_state(job["id"], "parsed")
+
+        return [
+            job for job, _ in pairs
+            if job.get("job_description_markdown") not in (None, "", "N/A")
+            and (job.get("cluster_id") or job["id"]) == job["id"]
+        ]
+
+    def score(jobs):
+        # Jobs with a cover letter from an earlier run were already chosen
+        resumed = [job for job in jobs if "cover_letter" in job or "cover_letter_path" in job]
+        jobs = [job for job in jobs if "cover_letter" not in job and "cover_letter_path" not in job]
+
+        if keywords and jobs:
+            matching = {match["id"] for match in indeed.db.search_jobs(
+                keywords, limit=len(jobs), columns=("id",), job_ids=[job["id"] for job in jobs]
+            )}
+            jobs = [job for job in jobs if job["id"] in matching]
+
+        if scorer and jobs:
+            # IDF is computed over every batch so far, so scores of different batches compare
+            selected = scorer.select(jobs, threshold=scoring_settings.get("threshold", 0), accumulate=True)
+
+            if not top_k:
+                return resumed + [job for job, _ in selected]
+
+            # Held back until the whole run was scored, see flush_score
+            for job, job_score in selected:
+                entry = (job_score, next(order), job)
+
+                if len(best) < top_k:
+                    heapq.heappush(best, entry)
+                elif entry[0] > best[0][0]:
+                    heapq.heapreplace(best, entry)
+
+            return resumed
+
+        return resumed + jobs
+
+    def flush_score():
+        return [job for _, _, job in sorted(best, key=lambda entry: (-entry[0], entry[1]))]
+
+    def generate(job):
+        if "cover_letter" in job or "cover_letter_path" in job:
+            return job
+
+        prompt = _build_cover_letter_prompt(job["job_description_markdown"], profile_context)
+
+        try:
+            job["cover_letter"] = GPT.shared().ask(prompt)
+        except Exception as e:
+            indeed.db.set_application_state(job["id"], "failed", error=f"Cover letter: {e}")
+            raise
+
+        job["generated"] = True
+        print(colored(f"=> Cover Letter Generated for Job {job['id']}!", "green"))
+
+        return job
+
+    def review(job):
+        if not job.pop("generated", False):
+            return job
+
+        if not interactive:
+            _queue_draft(job["id"], job["cover_letter"], indeed.db)
+            return None
+
+        while not _review_cover_letter(job["cover_letter"]):
+            job["cover_letter"] = GPT.shared().ask(
+                _build_cover_letter_prompt(job["job_description_markdown"], profile_context),
+                use_cache=False
+            )
+
+        os.makedirs(COVER_LETTERS_DIR, exist_ok=True)
+        markdown_path = os.path.join(COVER_LETTERS_DIR, f"{job['id']}.md")
+
+        with open(markdown_path, "w") as file:
+            file.write(job["cover_letter"])
+
+        indeed.db.set_application_state(job["id"], "letter_ready", cover_letter_path=markdown_path)
+
+        return job
+
+    def render(jobs):
+        to_render = {job["id"]: job["cover_letter"] for job in jobs if "cover_letter_path" not in job}
+        pdf_paths = _save_cover_letters(to_render)
+
+        for job_id in to_render:
+            if pdf_paths.get(job_id):
+                indeed.db.set_application_state(job_id, "rendered", cover_letter_path=pdf_paths[job_id])
+            else:
+                indeed.db.set_application_state(job_id, "failed", error="Couldn't render the cover letter")
+
+        for job in jobs:
+            job.setdefault("cover_letter_path", pdf_paths.get(job["id"]))
+
+        return [job for job in jobs if job["cover_letter_path"]]
+
+    def send(job):
+        return job if indeed.apply(job["id"], job["cover_letter_path"], resume_path) else None
+
+    return Pipeline([
+        Stage("parse", parse, workers=pipeline_settings.get("parseWorkers", 4)),
+        Stage("write", write, batch_size=batch_size),
+        Stage("score", score, batch_size=batch_size, flush=flush_score),
+        Stage("letter", generate, workers=llm_settings.get("concurrency", 4)),
+        Stage("review", review),
+        Stage("render", render, batch_size=batch_size),
+        Stage("send", send, workers=pipeline_settings.get("sendWorkers", 2)),
+    ], queue_size=pipeline_settings.get("queueSize", 32))
+
+def _run_pipeline(indeed, profile_context: str, resume_path: str) -> int:
+    """
+    Searches for jobs and applies to them, with every stage running at the
+    same time on the jobs found so far.
+
+    :param indeed: The Indeed provider, with a database.
+    :param profile_context: The precompiled user information, see `Profile.prompt_context`.
+    :param resume_path: Path of the resume to attach.
+
+    :return: Number of jobs applied to.
+    """
+    from classes.DriverPool import DriverPool
+
+    if not resume_path or not os.path.isfile(resume_path):
+        print(colored(f"=> Resume {resume_path} not found, not applying anywhere.", "red"))
+        return 0
+
+    keywords = get_indeed_settings().get("keywords")
+
+    # A bad query would otherwise fail the score stage for every batch
+    if keywords:
+        try:
+            indeed.db.search_jobs(keywords, limit=1, columns=("id",))
+        except ValueError as e:
+            print(colored(f"=> Check indeed.keywords in config.json. {e}", "red"))
+            return 0
+
+    parallelism = indeed.indeed_conf.get("parallelism", 1)
+    pool = DriverPool(size=parallelism, lean_settings=indeed.lean_settings) if parallelism > 1 else None
+
+    try:
+        pipeline = _build_pipeline(indeed, profile_context, resume_path, pool)
+        listings = (job for page in indeed.iter_listings() for job in page)
+
+        applied = sum(1 for _ in pipeline.run(listings))
+    finally:
+        if pool is not None:
+            pool.close()
+
+    pipeline.print_report()
+
+    counts = indeed.db.count_applications()
+    print(colored("=> Applications: " + ", ".join(f"{count} {state}" for state, count in sorted(counts.items())), "blue"))
+
+    if not get_llm_settings().get("interactive", True):
+        print(colored(f"=> Queued Cover Letters for Review in {DRAFTS_DIR}/", "green"))
 
-    #os.remove(cover_letter_path)
+    print(colored(f"=> Applied to {applied} Jobs.", "green"))
 
-    return pdf_path
+    return applied
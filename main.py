@@ -1,29 +1,103 @@
-from helpers import _kill_chrome, _generate_resume, _generate_cover_letter, _get_information
-from classes.Providers.Indeed import Indeed
+from helpers import _kill_chrome, _generate_resume, _generate_cover_letters, _get_information, _review_drafts, _rank_jobs, \
+    _pick_cluster_representatives, _run_pipeline
+from classes.Profile import Profile
+from classes.Metrics import metrics
+from classes.PDFRenderer import get_pdf_renderer
+from classes.Mailer import get_mailer
 from classes.Database import Database
+from config import get_indeed_settings, get_metrics_settings, get_chrome_config
+from termcolor import colored
 
+import argparse
 
 
 def main() -> None:
-    _kill_chrome()
+    parser = argparse.ArgumentParser(description="Automate sending job applications.")
+    parser.add_argument("--review", action="store_true", \
+                        help="Review queued cover letter drafts and apply to the approved jobs.")
+    parser.add_argument("--edit-profile", action="store_true", \
+                        help="Enter your profile again instead of loading profile.json.")
+    parser.add_argument("--batch", action="store_true", \
+                        help="Write cover letters for the stored jobs, one step after the other, instead of searching.")
+    parser.add_argument("--stop-browser", action="store_true", \
+                        help="Stop the browser kept running by chrome.daemon, then exit.")
+    args = parser.parse_args()
+
+    metrics.configure(get_metrics_settings())
+    chrome_config = get_chrome_config()
+
+    if args.stop_browser:
+        from classes.BrowserDaemon import BrowserDaemon
+
+        if not BrowserDaemon(chrome_config).stop():
+            print(colored("=> No Browser Daemon running.", "yellow"))
+        return
+
+    # A warm daemon browser is attached to, otherwise the profile has to be free
+    if not chrome_config.get("daemon", {}).get("enabled"):
+        _kill_chrome(chrome_config["userDataDir"])
+
     db = Database()
     db.create_table()
 
-    me = _get_information()
+    profile = None if args.edit_profile else Profile.load()
+    if profile is None:
+        profile = Profile(_get_information())
+        profile.save()
+
+    # Needed by the send stage, only rebuilt when the profile or theme changed
+    resume_path = _generate_resume(info=profile.data)
+
+    if resume_path is None:
+        print(colored("=> Resume could not be built, not applying anywhere.", "red"))
+        return
+
+    # Selenium is slow to import, only load it once the browser is needed
+    from classes.Providers.Indeed import Indeed
+    from classes.LeanBrowsing import network_stats
+    from classes.Waits import print_wait_report
 
     indeed = Indeed(db=db, \
                     job_query="Software Engineer", \
                         place_query="New York, USA")
-    indeed.search(advanced=True)
 
-    jobs = db.get_jobs()
-    print(jobs)
+    if args.review or args.batch:
+        if args.review:
+            cover_letters = _review_drafts(db, profile.prompt_context)
+        else:
+            indeed_settings = get_indeed_settings()
+
+            if indeed_settings.get("keywords"):
+                # Only spend LLM calls on the listings matching the keywords
+                try:
+                    jobs = db.search_jobs(indeed_settings["keywords"], limit=indeed_settings.get("maxJobs") or 1000, \
+                                          columns=("id", "cluster_id", "job_description_markdown"))
+                except ValueError as e:
+                    print(colored(f"=> Check indeed.keywords in config.json. {e}", "red"))
+                    return
+            else:
+                jobs = db.iter_jobs(columns=("id", "cluster_id", "job_description_markdown"), \
+                                    filters={"job_description_markdown": ("IS NOT", None)})
+
+            # Jobs waiting for review or already applied to don't get a new letter
+            jobs = [job for job in jobs if job["job_description_markdown"] and \
+                    (db.get_application(job["id"]) or {}).get("state") not in ("drafted", "sent")]
+            jobs = _rank_jobs(_pick_cluster_representatives(jobs), profile.data)
+            cover_letters = _generate_cover_letters(jobs, profile.prompt_context, db=db)
 
-    resume_path = _generate_resume(info=me)
+        for job_id, cover_letter_path in cover_letters.items():
+            db.set_application_state(int(job_id), "rendered", cover_letter_path=cover_letter_path)
+            indeed.apply(job_id, cover_letter_path, resume_path)
+    else:
+        _run_pipeline(indeed, profile.prompt_context, resume_path)
 
-    for job in jobs:
-        cover_letter_path = _generate_cover_letter(job["job_description_markdown"], me)
-        indeed.apply(job["id"], cover_letter_path, resume_path)
+    # Wait for the queued emails to be delivered
+    get_mailer().close()
+    get_pdf_renderer().close()
+    print_wait_report()
+    network_stats.print_report()
+    metrics.print_report()
+    metrics.export()
 
 if __name__ == "__main__":
     main()